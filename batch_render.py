@@ -0,0 +1,105 @@
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from portfolio_pdf import render_portfolio
+
+# Shared by the command line (main.py) and the admin bulk export: renders
+# many specs with a bounded number in flight and streams each PDF out as
+# soon as it is ready, so memory does not grow with the batch.
+
+# ---------- RENDERING ----------
+
+def render_many(items, pool=None, max_in_flight=None):
+    """Render ``(key, theme, spec)`` items; yield ``(key, RenderResult)`` as each finishes.
+
+    ``items`` is consumed lazily and at most ``max_in_flight`` specs (and
+    their PDFs) are held at once. Without a pool, items render one by one
+    in this thread, in order.
+    """
+    if pool is None:
+        for key, theme, spec in items:
+            yield key, render_portfolio(theme=theme, **spec)
+        return
+
+    limit = max_in_flight or pool.workers * 2
+    pending = {}
+    items = iter(items)
+    exhausted = False
+    while pending or not exhausted:
+        while not exhausted and len(pending) < limit:
+            try:
+                key, theme, spec = next(items)
+            except StopIteration:
+                exhausted = True
+                break
+            pending[pool.submit(theme, spec)] = key
+        if not pending:
+            break
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+
+def percentiles(values, points=(50, 90, 99)):
+    """Nearest-rank percentiles of ``values`` as {point: value}."""
+    ordered = sorted(values)
+    if not ordered:
+        return {p: 0.0 for p in points}
+    return {
+        p: ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))]
+        for p in points
+    }
+
+# ---------- OUTPUT ----------
+
+class DirectorySink:
+    """Writes each PDF into a directory as it arrives."""
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, name, data):
+        target = os.path.join(self.path, name)
+        tmp = target + ".part"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, target)
+        return target
+
+    def close(self):
+        pass
+
+class ZipSink:
+    """Appends each PDF to a zip archive (path or writable binary file) as it arrives."""
+
+    def __init__(self, dest):
+        self.dest = dest
+        self._zip = zipfile.ZipFile(dest, "w")
+
+    def write(self, name, data):
+        info = zipfile.ZipInfo(name, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_STORED  # page streams are already compressed
+        self._zip.writestr(info, data)
+        return name
+
+    def close(self):
+        self._zip.close()
+
+def open_sink(dest):
+    """Zip archive for ``*.zip`` paths and file objects, otherwise a directory."""
+    if not isinstance(dest, str) or dest.lower().endswith(".zip"):
+        return ZipSink(dest)
+    return DirectorySink(dest)
+
+def unique_name(name, used, suffix=".pdf"):
+    """Filesystem-safe ``name`` + ``suffix`` not yet in ``used`` (which is updated)."""
+    base = "".join(c if c.isalnum() or c in "-_." else "_" for c in name).strip("._") or "portfolio"
+    candidate = base + suffix
+    n = 2
+    while candidate in used:
+        candidate = f"{base}_{n}{suffix}"
+        n += 1
+    used.add(candidate)
+    return candidate
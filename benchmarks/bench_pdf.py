@@ -0,0 +1,371 @@
+"""PDF generation benchmarks over a generated corpus, with JSON baselines.
+
+    python benchmarks/bench_pdf.py list
+    python benchmarks/bench_pdf.py run [-o baseline.json] [-k text] [--repeat 3] [--timeout 300]
+    python benchmarks/bench_pdf.py compare baseline.json current.json [--threshold 0.15]
+
+Every case runs in a fresh process (so peak RSS is per case and a runaway
+case can be stopped by --timeout) against fixtures generated in memory:
+no files or network are needed. Each case records median/min wall time,
+peak Python allocations (tracemalloc), peak RSS, and for full exports the
+page count, output size and the split between compiling sections into
+flowables and layout. Timed exports follow a warm-up, so unchanged sections
+come from the section cache; compile_cold_ms is one export with it cleared.
+"""
+import argparse
+import base64
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_OUTPUT = "bench_pdf.json"
+METRICS = ("wall_ms", "compile_ms", "layout_ms", "peak_alloc_bytes", "peak_rss_bytes", "bytes")
+
+# ---------- FIXTURES ----------
+
+WORDS = (
+    "strategy analytics model revenue client risk governance pipeline insight "
+    "forecast adoption platform maturity roadmap value stakeholder impact data "
+    "automation capability investment outcome measure quality delivery"
+).split()
+
+def make_text(size, seed=1, sep="\n\n", sentences=True):
+    """About ``size`` characters of prose in ~600 character paragraphs joined by ``sep``.
+
+    With ``sentences=False`` the paragraphs are bare words (no capitals or
+    full stops), so ``sep=" "`` gives text with no break of any kind.
+    """
+    rng = random.Random(seed)
+    paragraphs, length = [], 0
+    while length < size:
+        words = [rng.choice(WORDS) for _ in range(90)]
+        para = " ".join(words).capitalize() + "." if sentences else " ".join(words)
+        paragraphs.append(para)
+        length += len(para) + 2
+    return sep.join(paragraphs)[:size]
+
+def make_lines(count, seed=2):
+    rng = random.Random(seed)
+    return "\n".join(
+        " ".join(rng.choice(WORDS) for _ in range(12)).capitalize() for _ in range(count)
+    )
+
+def make_scenarios(rows, seed=3, wrap=False):
+    """Pipe-separated scenario rows; ``wrap`` gives cells that wrap onto several lines."""
+    rng = random.Random(seed)
+    if wrap:
+        def words(n):
+            return " ".join(rng.choice(WORDS) for _ in range(n))
+        return "\n".join(
+            f"Option {i} | {words(8)} | {words(25)} | {words(30)} | {words(6)}"
+            for i in range(rows)
+        )
+    return "\n".join(
+        f"Option {i} | {rng.choice(['Low', 'Medium', 'High'])} Investment | "
+        f"{rng.randint(5, 40)}% ROI | {rng.choice(['Lower', 'Moderate', 'Higher'])} Risk | "
+        f"{rng.choice(['Recommended', 'Consider', 'Defer'])}"
+        for i in range(rows)
+    )
+
+def make_image(width, height, seed=4, fmt="PNG"):
+    """Gradient plus noise, so the encoded size behaves like a real photo."""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 40).convert("RGB")
+    img = Image.blend(img, noise, 0.3)
+    tint = Image.new("RGB", (width, height), tuple(rng.randint(0, 255) for _ in range(3)))
+    img = Image.blend(img, tint, 0.3)
+    out = BytesIO()
+    img.save(out, format=fmt)
+    return out.getvalue()
+
+# ---------- CASES ----------
+
+BASE_EXPORT = {"text": 4 << 10, "images": 0, "image_px": (800, 600), "logo_px": 0, "rows": 5, "theme": "Light"}
+
+def _export(name, **overrides):
+    return name, "export", {**BASE_EXPORT, **overrides}
+
+CASES = dict(
+    (name, (kind, params)) for name, kind, params in [
+        _export("export/base"),
+        _export("export/dark", theme="Dark"),
+        # layout should grow linearly with text size
+        _export("export/text-1k", text=1 << 10),
+        _export("export/text-16k", text=16 << 10),
+        _export("export/text-64k", text=64 << 10),
+        _export("export/text-256k", text=256 << 10),
+        _export("export/text-1m", text=1 << 20),
+        # one paragraph with line breaks only, and one with no breaks at all
+        _export("export/text-lines-256k", text=256 << 10, text_sep="\n"),
+        _export("export/text-runon-256k", text=256 << 10, text_sep=" ", text_sentences=False),
+        _export("export/images-1", images=1),
+        _export("export/images-8", images=8),
+        _export("export/images-4-large", images=4, image_px=(3000, 2000)),
+        _export("export/logo-small", logo_px=256),
+        _export("export/logo-large", logo_px=2000),
+        _export("export/rows-200", rows=200),
+        _export("export/edit-one", rows=200, images=8, edit=True),
+        _export("export/rows-5000", rows=5000),
+        # a few tall rows per page
+        _export("export/rows-wrap-300", rows=300, rows_wrap=True),
+        ("scenario_table/rows-10", "scenario_table", {"rows": 10, "theme": "Light"}),
+        ("scenario_table/rows-1000", "scenario_table", {"rows": 1000, "theme": "Light"}),
+        ("scenario_table/rows-5000", "scenario_table", {"rows": 5000, "theme": "Light"}),
+        ("bulleted_list/lines-10", "bulleted_list", {"lines": 10}),
+        ("bulleted_list/lines-1000", "bulleted_list", {"lines": 1000}),
+        ("image_flowables/8x800", "image_flowables", {"images": 8, "image_px": (800, 600)}),
+        ("image_flowables/2x4000", "image_flowables", {"images": 2, "image_px": (4000, 3000)}),
+        ("page_chrome/text-100", "page_chrome", {"pages": 100, "logo_px": 0, "theme": "Light"}),
+        ("page_chrome/logo-100", "page_chrome", {"pages": 100, "logo_px": 625, "theme": "Dark"}),
+    ]
+)
+
+def build_case(kind, params):
+    """Fixtures are generated here, outside the timed call; returns (fn, is_export)."""
+    import portfolio_pdf
+
+    if kind == "export":
+        image = make_image(*params["image_px"]) if params["images"] else None
+        spec = {
+            "project_title": "Benchmark Portfolio",
+            "name": "Bench",
+            "date": "2025-01-01",
+            "exec_summary": make_text(params["text"], sep=params.get("text_sep", "\n\n"),
+                                      sentences=params.get("text_sentences", True)),
+            "opportunities": make_lines(8),
+            "risks": make_lines(8, seed=5),
+            "scenarios": make_scenarios(params["rows"], wrap=params.get("rows_wrap", False)),
+            "reflection": make_text(2 << 10, seed=6),
+            "exec_summary_images": [image] * params["images"] if image else [],
+        }
+        if params["logo_px"]:
+            logo = make_image(params["logo_px"], params["logo_px"], seed=7)
+            spec["logo"] = base64.b64encode(logo).decode("ascii")
+        if params.get("edit"):
+            # tweak one section between exports, as users do before re-exporting
+            summary = spec["exec_summary"]
+            revisions = iter(range(1, 1 << 30))
+
+            def export_edited():
+                spec["exec_summary"] = f"{summary} Revision {next(revisions)}."
+                return portfolio_pdf.generate_pdf(theme=params["theme"], **spec)
+            return export_edited, True
+        return lambda: portfolio_pdf.generate_pdf(theme=params["theme"], **spec), True
+
+    if kind == "scenario_table":
+        raw = make_scenarios(params["rows"])
+        return lambda: portfolio_pdf._scenario_table(raw, theme=params["theme"]), False
+
+    if kind == "bulleted_list":
+        raw = make_lines(params["lines"])
+        style = portfolio_pdf._make_styles("Light")["bullet"]
+        return lambda: portfolio_pdf._bulleted_list(raw, style), False
+
+    if kind == "image_flowables":
+        images = [make_image(*params["image_px"], seed=i) for i in range(params["images"])]
+        return lambda: portfolio_pdf._image_flowables(images, max_width=450), False
+
+    if kind == "page_chrome":
+        from reportlab.lib.pagesizes import letter
+        from reportlab.lib.utils import ImageReader
+        from reportlab.pdfgen import canvas
+        from reportlab.platypus import BaseDocTemplate
+
+        logo = make_image(params["logo_px"], params["logo_px"], fmt="JPEG") if params["logo_px"] else None
+
+        def stamp_pages():
+            out = BytesIO()
+            doc = BaseDocTemplate(out, pagesize=letter)
+            canv = canvas.Canvas(out, pagesize=letter, invariant=1)
+            reader = ImageReader(BytesIO(logo)) if logo else None
+            chrome = portfolio_pdf.PageChrome(params["theme"], logo=reader, logo_key="Bench" if logo else None,
+                                              page_numbers=True)
+            for page in range(1, params["pages"] + 1):
+                doc.page = page
+                portfolio_pdf._on_page(canv, doc, chrome)
+                canv.showPage()
+            canv.save()
+            return out.getvalue()
+        return stamp_pages, False
+
+    raise ValueError(f"unknown case kind {kind!r}")
+
+# ---------- RUNNER ----------
+
+def _phase_ms(collected, name):
+    return sum(seconds for phase, seconds in collected["spans"] if phase == name) * 1000
+
+def _measure(name, repeat, conn):
+    """Child process: build fixtures, warm up, time, then trace allocations."""
+    os.environ["PORTFOLIO_TELEMETRY"] = "1"  # compile/layout spans; read at import
+    try:
+        from portfolio_pdf import SECTION_CACHE, page_count
+        from telemetry import collect
+
+        kind, params = CASES[name]
+        fn, is_export = build_case(kind, params)
+        output = fn()  # warm-up: imports, style registry, font metrics
+        times = []
+        phases = []
+        for _ in range(repeat):
+            with collect() as collected:
+                start = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - start)
+            phases.append(collected)
+        tracemalloc.start()
+        fn()
+        _, peak_alloc = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        record = {
+            "status": "ok",
+            "wall_ms": statistics.median(times) * 1000,
+            "wall_min_ms": min(times) * 1000,
+            "peak_alloc_bytes": peak_alloc,
+            "peak_rss_bytes": rss * (1 if sys.platform == "darwin" else 1024),
+        }
+        if is_export:
+            record["pages"] = page_count(output)
+            record["bytes"] = len(output)
+            record["compile_ms"] = statistics.median(_phase_ms(c, "compile") for c in phases)
+            record["layout_ms"] = statistics.median(_phase_ms(c, "build") for c in phases)
+            SECTION_CACHE.clear()
+            with collect() as collected:
+                fn()
+            record["compile_cold_ms"] = _phase_ms(collected, "compile")
+        conn.send(record)
+    except Exception as e:
+        conn.send({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+def run_case(name, repeat=3, timeout=300.0):
+    ctx = multiprocessing.get_context("spawn")
+    parent, child = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_measure, args=(name, repeat, child))
+    started = time.perf_counter()
+    proc.start()
+    child.close()
+    if parent.poll(timeout):
+        record = parent.recv()
+    else:
+        record = {"status": "timeout", "error": f"no result after {timeout:.0f}s"}
+        proc.terminate()
+    proc.join()
+    record["case_seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+def _meta():
+    import reportlab
+
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "reportlab": reportlab.Version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+def cmd_list(args):
+    for name, (kind, params) in CASES.items():
+        print(f"{name:<28}{json.dumps(params)}")
+
+def cmd_run(args):
+    names = [n for n in CASES if not args.k or any(k in n for k in args.k)]
+    results = {"meta": _meta(), "cases": {}}
+    print(f"{'case':<28}{'status':>8}{'wall ms':>11}{'compile':>9}{'cold':>8}{'layout':>9}"
+          f"{'alloc MB':>10}{'rss MB':>9}{'pages':>7}{'KB':>9}")
+    for name in names:
+        r = run_case(name, repeat=args.repeat, timeout=args.timeout)
+        results["cases"][name] = r
+        if r["status"] == "ok":
+            phases = "".join(
+                format(r[k], f"{w}.1f") if k in r else " " * w
+                for k, w in (("compile_ms", 9), ("compile_cold_ms", 8), ("layout_ms", 9))
+            )
+            print(
+                f"{name:<28}{'ok':>8}{r['wall_ms']:>11.1f}{phases}{r['peak_alloc_bytes'] / 1e6:>10.1f}"
+                f"{r['peak_rss_bytes'] / 1e6:>9.0f}{r.get('pages', ''):>7}"
+                f"{(format(r['bytes'] / 1024, '.0f') if 'bytes' in r else ''):>9}",
+                flush=True,
+            )
+        else:
+            print(f"{name:<28}{r['status']:>8}  {r['error']}", flush=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {len(names)} case(s) to {args.output}")
+
+def compare(baseline, current, threshold=0.15, min_ms=1.0):
+    """Rows of (case, metric, old, new, ratio, regressed) for cases in both runs."""
+    rows = []
+    for name, new in current["cases"].items():
+        old = baseline["cases"].get(name)
+        if old is None:
+            continue
+        if old["status"] == "ok" and new["status"] != "ok":
+            rows.append((name, "status", old["status"], new["status"], None, True))
+            continue
+        if new["status"] != "ok" or old["status"] != "ok":
+            rows.append((name, "status", old["status"], new["status"], None, False))
+            continue
+        for metric in METRICS:
+            if metric not in old or metric not in new or not old[metric]:
+                continue
+            ratio = new[metric] / old[metric]
+            # sub-millisecond timings are mostly noise
+            noisy = metric == "wall_ms" and max(old[metric], new[metric]) < min_ms
+            rows.append((name, metric, old[metric], new[metric], ratio,
+                         ratio > 1 + threshold and not noisy))
+    return rows
+
+def cmd_compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    rows = compare(baseline, current, args.threshold)
+    regressions = 0
+    print(f"{'case':<28}{'metric':<18}{'baseline':>14}{'current':>14}{'change':>9}")
+    for name, metric, old, new, ratio, regressed in rows:
+        if ratio is None:
+            change = "" if old == new else "changed"
+            print(f"{name:<28}{metric:<18}{old:>14}{new:>14}{change:>9}{'  REGRESSION' if regressed else ''}")
+        else:
+            print(f"{name:<28}{metric:<18}{old:>14.1f}{new:>14.1f}{ratio - 1:>+9.1%}"
+                  f"{'  REGRESSION' if regressed else ''}")
+        regressions += regressed
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="show the benchmark cases")
+    p_run = sub.add_parser("run", help="run cases and write a JSON result file")
+    p_run.add_argument("-o", "--output", default=DEFAULT_OUTPUT)
+    p_run.add_argument("-k", action="append", help="only cases whose name contains this (repeatable)")
+    p_run.add_argument("--repeat", type=int, default=3, help="timed runs per case (median is reported)")
+    p_run.add_argument("--timeout", type=float, default=300.0, help="seconds before a case is abandoned")
+    p_cmp = sub.add_parser("compare", help="flag regressions between two result files")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown/growth (0.15 = 15%%)")
+    args = parser.parse_args(argv)
+    return {"list": cmd_list, "run": cmd_run, "compare": cmd_compare}[args.command](args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Per-export style setup cost, with and without the style registry.
+
+    python benchmarks/bench_styles.py [--repeat 200]
+
+"cold" clears the registry before every export (what each build used to
+pay); "warm" reuses the bundles built by the first export.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import portfolio_pdf  # noqa: E402
+
+REGISTRY = (
+    portfolio_pdf._theme_colors,
+    portfolio_pdf._make_styles,
+    portfolio_pdf._scenario_cell_styles,
+    portfolio_pdf._scenario_table_style,
+    portfolio_pdf._accent_bar_style,
+)
+
+SCENARIOS = "\n".join(
+    f"Option {i} | High Investment | {10 + i}% ROI | Moderate Risk | Recommended" for i in range(8)
+)
+
+SPEC = {
+    "project_title": "Style Benchmark",
+    "name": "Bench",
+    "exec_summary": "Short summary.",
+    "scenarios": SCENARIOS,
+}
+
+def clear_registry():
+    for fn in REGISTRY:
+        fn.cache_clear()
+
+def setup(theme, font):
+    """The style work one export does before layout starts."""
+    portfolio_pdf._make_styles(theme, base_font=font)
+    portfolio_pdf._scenario_cell_styles(theme)
+    portfolio_pdf._scenario_table_style(theme)
+    portfolio_pdf._accent_bar_style(theme)
+    for _ in range(10):  # footer/page number lookups
+        portfolio_pdf._theme_colors(theme)
+
+def timed(fn, repeat, cold):
+    samples = []
+    for i in range(repeat):
+        theme = ("Light", "Dark")[i % 2]
+        if cold:
+            clear_registry()
+        start = time.perf_counter()
+        fn(theme)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--font", default="Helvetica")
+    args = parser.parse_args()
+
+    cases = [
+        ("style setup", lambda theme: setup(theme, args.font), args.repeat),
+        ("full export", lambda theme: portfolio_pdf.generate_pdf(theme=theme, font_choice=args.font, **SPEC),
+         max(args.repeat // 10, 5)),
+    ]
+    print(f"{'case':<14}{'cold ms':>10}{'warm ms':>10}{'saved':>8}")
+    for name, fn, repeat in cases:
+        fn("Light")  # import-time and font-metric costs out of the way
+        cold = timed(fn, repeat, cold=True)
+        warm = timed(fn, repeat, cold=False)
+        print(f"{name:<14}{cold:>10.3f}{warm:>10.3f}{(1 - warm / cold):>8.0%}")
+
+if __name__ == "__main__":
+    main()
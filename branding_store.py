@@ -0,0 +1,556 @@
+import argparse
+import base64
+import hashlib
+import json
+import io
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # renditions fall back to the original logo
+    PILImage = None
+
+# Logos live outside the preset JSON as raw bytes, addressed by SHA-256
+LOGO_BLOB_DIR = "branding_logos"
+# Preset library (one row per preset); branding_presets.json stays the exchange format
+PRESET_DB_FILE = "branding_presets.db"
+
+# Sized copies of each logo, built once per logo hash: (max pixels, format)
+LOGO_RENDITIONS = {
+    "thumb": (256, "PNG"),       # st.image at 150-200 px
+    "cover": (480, "PNG"),       # 1.6 in PDF cover logo at 300 DPI
+    "watermark": (625, "JPEG"),  # 300 pt page watermark at ~150 DPI
+}
+# watermark opacity, flattened onto the white page so the PDF needs no soft mask
+WATERMARK_ALPHA = 0.1
+
+PRESET_FIELDS = ("name", "brand_color", "font_choice", "pdf_theme", "logo_sha256", "logo_size")
+PRESET_PAGE_SIZE = 25
+
+# Preset bundles: zip with a header, one JSON line per preset and raw logo entries
+BUNDLE_HEADER = "bundle.json"
+BUNDLE_MANIFEST = "presets.jsonl"
+BUNDLE_LOGO_DIR = "logos/"
+BUNDLE_FORMAT = 1
+BUNDLE_MODES = ("merge", "keep", "replace")
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# ---------- LOGO BLOB STORE ----------
+
+def _blob_path(digest):
+    return os.path.join(LOGO_BLOB_DIR, digest[:2], digest)
+
+def _atomic_write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+def store_logo(data: bytes) -> str:
+    """Write logo bytes to the blob store (once per content) and return the hash."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = _blob_path(digest)
+    if not os.path.exists(path):
+        _atomic_write(path, data)
+        build_renditions(digest, data)
+    return digest
+
+def store_logo_stream(src, expected=None, chunk_size=1 << 16):
+    """Copy a logo from a file object into the blob store without buffering it.
+
+    Raises ValueError when ``expected`` is given and the content does not match.
+    """
+    os.makedirs(LOGO_BLOB_DIR, exist_ok=True)
+    h = hashlib.sha256()
+    fd, tmp = tempfile.mkstemp(dir=LOGO_BLOB_DIR, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: src.read(chunk_size), b""):
+                h.update(chunk)
+                out.write(chunk)
+        digest = h.hexdigest()
+        if expected and digest != expected:
+            raise ValueError(f"logo content does not match {expected}")
+        path = _blob_path(digest)
+        if os.path.exists(path):
+            os.unlink(tmp)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+            build_renditions(digest)
+        return digest
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+def load_logo(digest):
+    if not digest:
+        return None
+    try:
+        with open(_blob_path(digest), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+def has_logo(digest):
+    return bool(digest) and os.path.exists(_blob_path(digest))
+
+# ---------- LOGO RENDITIONS ----------
+
+def _rendition_path(digest, kind):
+    ext = LOGO_RENDITIONS[kind][1].lower()
+    return os.path.join(LOGO_BLOB_DIR, "renditions", digest[:2], f"{digest}-{kind}.{ext}")
+
+def _render(data, kind):
+    max_px, fmt = LOGO_RENDITIONS[kind]
+    img = PILImage.open(io.BytesIO(data))
+    img.load()
+    img = img.convert("RGBA")
+    img.thumbnail((max_px, max_px), PILImage.LANCZOS)
+    if kind == "watermark":
+        alpha = img.getchannel("A").point(lambda a: int(a * WATERMARK_ALPHA))
+        flat = PILImage.new("RGB", img.size, "white")
+        flat.paste(img.convert("RGB"), mask=alpha)
+        img = flat
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(out, "JPEG", quality=85, optimize=True)
+    else:
+        img.save(out, fmt, optimize=True)
+    return out.getvalue()
+
+def build_renditions(digest, data=None):
+    """Write every missing rendition of a stored logo; returns the kinds built."""
+    if PILImage is None:
+        return []
+    built = []
+    for kind in LOGO_RENDITIONS:
+        path = _rendition_path(digest, kind)
+        if os.path.exists(path):
+            continue
+        if data is None:
+            data = load_logo(digest)
+            if data is None:
+                return built
+        try:
+            _atomic_write(path, _render(data, kind))
+            built.append(kind)
+        except Exception:
+            # unreadable image: callers fall back to the original bytes
+            continue
+    return built
+
+def load_rendition(digest, kind):
+    """Bytes of a logo rendition, built on first use for older presets."""
+    if not digest:
+        return None
+    path = _rendition_path(digest, kind)
+    if not os.path.exists(path):
+        build_renditions(digest)
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return load_logo(digest)
+
+def logo_fields(data):
+    """Preset fields describing a logo, without the logo itself."""
+    if not data:
+        return {"logo_sha256": None, "logo_size": 0}
+    return {"logo_sha256": store_logo(data), "logo_size": len(data)}
+
+# ---------- MIGRATION ----------
+
+def migrate_inline_logos(presets):
+    """Move legacy base64 ``logo`` fields into the blob store, in place.
+
+    Returns True when at least one preset was rewritten.
+    """
+    changed = False
+    for preset in presets.values():
+        if "logo" not in preset:
+            continue
+        inline = preset.pop("logo")
+        data = None
+        if inline:
+            try:
+                data = base64.b64decode(inline)
+            except (ValueError, TypeError):
+                data = None
+        preset.update(logo_fields(data))
+        changed = True
+    return changed
+
+# ---------- PRESET REPOSITORY ----------
+
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS presets (
+    preset      TEXT PRIMARY KEY,
+    name        TEXT,
+    brand_color TEXT,
+    font_choice TEXT,
+    pdf_theme   TEXT,
+    logo_sha256 TEXT,
+    logo_size   INTEGER NOT NULL DEFAULT 0,
+    updated_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS presets_by_name ON presets (preset COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+def _preset_row(preset, fields, updated_at):
+    return (
+        preset,
+        fields.get("name"),
+        fields.get("brand_color"),
+        fields.get("font_choice"),
+        fields.get("pdf_theme"),
+        fields.get("logo_sha256"),
+        int(fields.get("logo_size") or 0),
+        updated_at,
+    )
+
+class PresetRepository:
+    """Brand presets in SQLite (WAL): single-row writes, non-blocking readers."""
+
+    def __init__(self, path=PRESET_DB_FILE):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # --- reads
+
+    def get(self, preset):
+        row = self._conn().execute(
+            "SELECT * FROM presets WHERE preset = ?", (preset,)
+        ).fetchone()
+        return self._fields(row) if row else None
+
+    def all(self):
+        rows = self._conn().execute("SELECT * FROM presets ORDER BY preset").fetchall()
+        return {row["preset"]: self._fields(row) for row in rows}
+
+    def iter_presets(self):
+        """(preset, fields) pairs streamed from a cursor, in name order."""
+        cur = self._conn().execute("SELECT * FROM presets ORDER BY preset")
+        for row in cur:
+            yield row["preset"], self._fields(row)
+
+    def names(self):
+        return [r[0] for r in self._conn().execute("SELECT preset FROM presets ORDER BY preset")]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM presets").fetchone()[0]
+
+    def search(self, query="", page=0, page_size=PRESET_PAGE_SIZE):
+        """One page of preset metadata plus the total number of matches.
+
+        Prefix matches rank first, then substring, then fuzzy (the query's
+        characters in order, e.g. "dsh" finds "Data Science in Healthcare").
+        Logos are not read; use ``load_logo(row["logo_sha256"])`` on demand.
+        """
+        query = query.strip()
+        conn = self._conn()
+        offset = max(page, 0) * page_size
+        if not query:
+            total = self.count()
+            rows = conn.execute(
+                "SELECT * FROM presets ORDER BY preset COLLATE NOCASE LIMIT ? OFFSET ?",
+                (page_size, offset),
+            ).fetchall()
+            return [self._summary(r) for r in rows], total
+
+        escaped = [_like_escape(ch) for ch in query]
+        prefix = "".join(escaped) + "%"
+        substring = "%" + prefix
+        fuzzy = "%" + "%".join(escaped) + "%"
+        total = conn.execute(
+            "SELECT COUNT(*) FROM presets WHERE preset LIKE ? ESCAPE '\\'", (fuzzy,)
+        ).fetchone()[0]
+        rows = conn.execute(
+            """
+            SELECT * FROM presets
+            WHERE preset LIKE :fuzzy ESCAPE '\\'
+            ORDER BY CASE
+                         WHEN preset LIKE :prefix ESCAPE '\\' THEN 0
+                         WHEN preset LIKE :substring ESCAPE '\\' THEN 1
+                         ELSE 2
+                     END,
+                     preset COLLATE NOCASE
+            LIMIT :limit OFFSET :offset
+            """,
+            {"fuzzy": fuzzy, "prefix": prefix, "substring": substring,
+             "limit": page_size, "offset": offset},
+        ).fetchall()
+        return [self._summary(r) for r in rows], total
+
+    @staticmethod
+    def _fields(row):
+        return {field: row[field] for field in PRESET_FIELDS}
+
+    @classmethod
+    def _summary(cls, row):
+        summary = cls._fields(row)
+        summary["preset"] = row["preset"]
+        summary["updated_at"] = row["updated_at"]
+        return summary
+
+    # --- writes
+
+    @contextmanager
+    def transaction(self):
+        """One commit for every write inside (rolled back on error); nests."""
+        conn = self._conn()
+        if getattr(self._local, "in_transaction", False):
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.in_transaction = True
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.in_transaction = False
+
+    def upsert(self, preset, fields):
+        with self.transaction() as conn:
+            conn.execute(
+                """
+                INSERT INTO presets (preset, name, brand_color, font_choice, pdf_theme,
+                                     logo_sha256, logo_size, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(preset) DO UPDATE SET
+                    name = excluded.name,
+                    brand_color = excluded.brand_color,
+                    font_choice = excluded.font_choice,
+                    pdf_theme = excluded.pdf_theme,
+                    logo_sha256 = excluded.logo_sha256,
+                    logo_size = excluded.logo_size,
+                    updated_at = excluded.updated_at
+                """,
+                _preset_row(preset, fields, time.time()),
+            )
+
+    def delete(self, preset):
+        with self.transaction() as conn:
+            cur = conn.execute("DELETE FROM presets WHERE preset = ?", (preset,))
+        return cur.rowcount > 0
+
+    def replace_all(self, presets):
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM presets")
+            conn.executemany(
+                "INSERT INTO presets VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [_preset_row(k, v, now) for k, v in presets.items()],
+            )
+
+    # --- JSON compatibility
+
+    def import_json(self, path, overwrite=True):
+        """Load a branding_presets.json file (inline base64 or hashed logos)."""
+        with open(path, "r") as f:
+            presets = json.load(f)
+        migrate_inline_logos(presets)
+        imported = 0
+        for preset, fields in presets.items():
+            if not overwrite and self.get(preset) is not None:
+                continue
+            self.upsert(preset, fields)
+            imported += 1
+        return imported
+
+    def export_json(self, path):
+        """Write the legacy branding_presets.json format (logos inline as base64).
+
+        Self-contained, and readable by older versions of the app; bundles are
+        the compact way to move large libraries.
+        """
+        presets = {}
+        for preset, fields in self.iter_presets():
+            digest = fields.pop("logo_sha256")
+            fields.pop("logo_size")
+            logo = load_logo(digest)
+            fields["logo"] = base64.b64encode(logo).decode("ascii") if logo else None
+            presets[preset] = fields
+        data = json.dumps(presets, indent=2).encode("utf-8")
+        _atomic_write(os.path.abspath(path), data)
+
+    def bootstrap_from_json(self, path):
+        """Import the legacy JSON library once, the first time this database sees it."""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_imported'").fetchone():
+            return 0
+        imported = self.import_json(path, overwrite=False) if os.path.exists(path) else 0
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_imported', ?)", (path,))
+        return imported
+
+# ---------- BUNDLES ----------
+
+def export_bundle(repo, dest):
+    """Write the whole library to a zip bundle (path or binary file object).
+
+    Presets are streamed from the database and each logo is copied entry by
+    entry, so memory does not grow with the library.
+    """
+    with zipfile.ZipFile(dest, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(BUNDLE_HEADER, json.dumps({
+            "format": BUNDLE_FORMAT,
+            "presets": repo.count(),
+            "created_at": time.time(),
+        }))
+        # zipfile allows one open entry at a time: logos first, then the manifest
+        seen = set()
+        logos = 0
+        for _, fields in repo.iter_presets():
+            digest = fields.get("logo_sha256")
+            if not digest or digest in seen or not has_logo(digest):
+                continue
+            seen.add(digest)
+            info = zipfile.ZipInfo(BUNDLE_LOGO_DIR + digest, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED  # images are already compressed
+            with open(_blob_path(digest), "rb") as src, zf.open(info, "w") as out:
+                shutil.copyfileobj(src, out)
+            logos += 1
+        presets = 0
+        info = zipfile.ZipInfo(BUNDLE_MANIFEST, time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with zf.open(info, "w") as raw:
+            manifest = io.TextIOWrapper(raw, encoding="utf-8")
+            for preset, fields in repo.iter_presets():
+                manifest.write(json.dumps({"preset": preset, **fields}) + "\n")
+                presets += 1
+            manifest.flush()
+            manifest.detach()
+    return {"presets": presets, "logos": logos}
+
+def import_bundle(repo, src, mode="merge"):
+    """Load a bundle written by ``export_bundle``.
+
+    ``mode``: "merge" lets bundle presets overwrite same-named ones, "keep"
+    leaves existing presets untouched, "replace" also deletes presets that
+    are not in the bundle. Logos already in the blob store are skipped.
+    """
+    if mode not in BUNDLE_MODES:
+        raise ValueError(f"mode must be one of {BUNDLE_MODES}")
+    stats = {"presets": 0, "presets_skipped": 0, "presets_removed": 0,
+             "logos": 0, "logos_skipped": 0}
+    with zipfile.ZipFile(src) as zf:
+        try:
+            header = json.loads(zf.read(BUNDLE_HEADER))
+        except KeyError:
+            raise ValueError("not a preset bundle (missing bundle.json)")
+        if header.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"unsupported bundle format {header.get('format')}")
+
+        for info in zf.infolist():
+            if not info.filename.startswith(BUNDLE_LOGO_DIR):
+                continue
+            digest = info.filename[len(BUNDLE_LOGO_DIR):]
+            if not _SHA256_RE.match(digest):
+                continue
+            if has_logo(digest):
+                stats["logos_skipped"] += 1
+                continue
+            with zf.open(info) as entry:
+                store_logo_stream(entry, expected=digest)
+            stats["logos"] += 1
+
+        # presets change all at once or not at all; stored logos are harmless extras
+        imported = set()
+        with repo.transaction(), zf.open(BUNDLE_MANIFEST) as raw:
+            for line in io.TextIOWrapper(raw, encoding="utf-8"):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                preset = record.pop("preset")
+                imported.add(preset)
+                if mode == "keep" and repo.get(preset) is not None:
+                    stats["presets_skipped"] += 1
+                    continue
+                repo.upsert(preset, record)
+                stats["presets"] += 1
+
+            if mode == "replace":
+                for preset in repo.names():
+                    if preset not in imported:
+                        repo.delete(preset)
+                        stats["presets_removed"] += 1
+    return stats
+
+# ---------- CLI ----------
+
+def _cli(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the branding preset library.")
+    parser.add_argument("--db", default=PRESET_DB_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_imp = sub.add_parser("import-json", help="import a branding_presets.json file")
+    p_imp.add_argument("path")
+    p_imp.add_argument("--keep-existing", action="store_true")
+    p_exp = sub.add_parser("export-json", help="export the library as branding_presets.json (logos inline)")
+    p_exp.add_argument("path")
+    p_bexp = sub.add_parser("export-bundle", help="export presets and logos as a zip bundle")
+    p_bexp.add_argument("path")
+    p_bimp = sub.add_parser("import-bundle", help="import a zip bundle")
+    p_bimp.add_argument("path")
+    p_bimp.add_argument("--mode", choices=BUNDLE_MODES, default="merge")
+    args = parser.parse_args(argv)
+
+    repo = PresetRepository(args.db)
+    if args.command == "import-json":
+        n = repo.import_json(args.path, overwrite=not args.keep_existing)
+        print(f"Imported {n} preset(s) into {args.db}")
+    elif args.command == "export-json":
+        repo.export_json(args.path)
+        print(f"Exported {repo.count()} preset(s) to {args.path}")
+    elif args.command == "export-bundle":
+        stats = export_bundle(repo, args.path)
+        print(f"Exported {stats['presets']} preset(s) and {stats['logos']} logo(s) to {args.path}")
+    elif args.command == "import-bundle":
+        stats = import_bundle(repo, args.path, mode=args.mode)
+        print(
+            f"Imported {stats['presets']} preset(s) ({stats['presets_skipped']} kept, "
+            f"{stats['presets_removed']} removed), {stats['logos']} new logo(s) "
+            f"({stats['logos_skipped']} already present)"
+        )
+
+if __name__ == "__main__":
+    _cli()
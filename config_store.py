@@ -0,0 +1,164 @@
+import json
+import os
+import tempfile
+import threading
+from types import MappingProxyType
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # fall back to mtime polling
+    FileSystemEventHandler = object
+    Observer = None
+
+# ---------- FROZEN VALUES ----------
+
+def freeze(value):
+    """Read-only view of decoded JSON, safe to share between sessions."""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)
+    return value
+
+def thaw(value):
+    """Editable deep copy of a frozen value (what save paths expect)."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(v) for v in value]
+    return value
+
+# ---------- ATOMIC WRITES ----------
+
+def atomic_write_json(path, data):
+    """Write JSON next to ``path`` and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+# ---------- FILE WATCHING ----------
+
+_observer = None
+_observer_lock = threading.Lock()
+_watched_dirs = set()
+
+class _StaleHandler(FileSystemEventHandler):
+    def __init__(self, paths, callback):
+        self.paths = paths
+        self.callback = callback
+
+    def on_any_event(self, event):
+        for attr in ("src_path", "dest_path"):
+            path = getattr(event, attr, None)
+            if path and os.path.abspath(path) in self.paths:
+                self.callback()
+                return
+
+def _watch(paths, callback):
+    """Call ``callback`` whenever one of ``paths`` changes; False if unavailable."""
+    global _observer
+    if Observer is None:
+        return False
+    try:
+        with _observer_lock:
+            if _observer is None:
+                _observer = Observer()
+                _observer.daemon = True
+                _observer.start()
+            handler = _StaleHandler(set(paths), callback)
+            for directory in {os.path.dirname(p) for p in paths}:
+                _observer.schedule(handler, directory, recursive=False)
+                _watched_dirs.add(directory)
+        return True
+    except Exception:
+        return False
+
+# ---------- SNAPSHOTS ----------
+
+class ConfigSnapshot:
+    """Process-wide, immutable copy of on-disk state.
+
+    ``loader`` runs only when a watched file reports a change (filesystem
+    event, or mtime/size when watchdog is not available). Every reload or
+    ``publish`` bumps ``version``.
+    """
+
+    def __init__(self, paths, loader):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._data = None
+        self._stamp = None
+        self._stale = True
+        self.version = 0
+        self._watching = _watch(self.paths, self._mark_stale)
+
+    def _mark_stale(self):
+        self._stale = True
+
+    def _file_stamp(self):
+        stamp = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                stamp.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def get(self):
+        if self._data is not None and self._watching and not self._stale:
+            return self._data
+        with self._lock:
+            self._stale = False
+            stamp = self._file_stamp()
+            if self._data is None or stamp != self._stamp:
+                self._data = freeze(self._loader())
+                self._stamp = stamp
+                self.version += 1
+            return self._data
+
+    def invalidate(self):
+        """Reload on the next ``get`` even if no watched file changed."""
+        with self._lock:
+            self._data = None
+
+    def publish(self, data):
+        """Install ``data`` as the current snapshot after a write to the files."""
+        with self._lock:
+            self._data = freeze(data)
+            self._stamp = self._file_stamp()
+            self._stale = False
+            self.version += 1
+            return self._data
+
+class JsonConfig(ConfigSnapshot):
+    """A JSON settings file with a shared snapshot and atomic writes."""
+
+    def __init__(self, path, default=None):
+        self.path = path
+        self.default = default or {}
+        super().__init__([path], self._read)
+
+    def _read(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return thaw(self.default)
+
+    def save(self, data):
+        data = thaw(data)
+        with self._lock:
+            atomic_write_json(self.path, data)
+        return self.publish(data)
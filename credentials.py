@@ -0,0 +1,408 @@
+import argparse
+import base64
+import getpass
+import hashlib
+import heapq
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+from collections import namedtuple
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from config_store import ConfigSnapshot, atomic_write_json, thaw
+
+# Login accounts: the [users] table of Streamlit secrets plus an optional
+# users file of pre-hashed verifiers (for onboarding many clients without
+# redeploying secrets). Secrets win when a username appears in both.
+USERS_FILE = os.environ.get("PORTFOLIO_USERS_FILE", "users.json")
+PBKDF2_ITERATIONS = 600_000
+ROLES = ("admin", "client")
+DEFAULT_OVERRIDE_HOURS = 24
+
+# Accounts that predate the users file: secrets hold only `<user>_password`
+LEGACY_USERS = {
+    "alierwai": ("admin", "Alier Reng"),
+    "client1": ("client", "Client One"),
+    "client2": ("client", "Client Two"),
+}
+
+# verifier is None for secrets given as plain passwords (derived on first login)
+User = namedtuple("User", "username name role verifier password", defaults=(None,))
+
+# ---------- VERIFIERS ----------
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+def make_verifier(password, iterations=PBKDF2_ITERATIONS, salt=None):
+    """``pbkdf2_sha256$<iterations>$<salt>$<hash>`` for ``password`` (fresh random salt)."""
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+
+def check_password(password, verifier):
+    """Constant-time check of ``password`` against a ``make_verifier`` string."""
+    try:
+        scheme, iterations, salt, expected = verifier.split("$")
+        if scheme != "pbkdf2_sha256":
+            return False
+        digest = hashlib.pbkdf2_hmac(
+            "sha256", password.encode("utf-8"), base64.b64decode(salt), int(iterations)
+        )
+        return hmac.compare_digest(digest, base64.b64decode(expected))
+    except (AttributeError, ValueError):
+        return False
+
+@lru_cache(maxsize=1)
+def _dummy_verifier():
+    # unknown usernames cost the same hash as known ones
+    return make_verifier(secrets.token_urlsafe(16))
+
+# ---------- SOURCES ----------
+
+def read_users_file(path):
+    """``{username: {name, role, verifier}}`` from a users file (empty if missing)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("users", {})
+    except FileNotFoundError:
+        return {}
+
+def _secret_users(table):
+    """Users from the secrets ``[users]`` table.
+
+    ``<user>_password = "..."`` entries are the original format (roles and
+    names for those come from LEGACY_USERS, other users are clients);
+    ``[users.<user>]`` sub-tables may set password or verifier, role, name.
+    Plain passwords are not hashed here, so building the index stays cheap.
+    """
+    users = {}
+    for key, value in (table or {}).items():
+        if isinstance(value, Mapping):
+            username, entry = key, dict(value)
+        elif key.endswith("_password"):
+            username, entry = key[: -len("_password")], {"password": value}
+        else:
+            continue
+        if not (entry.get("verifier") or entry.get("password")):
+            continue  # never an account with an empty password
+        role, name = LEGACY_USERS.get(username, ("client", username))
+        password = None if entry.get("verifier") else str(entry["password"])
+        users[username] = User(username, entry.get("name", name), entry.get("role", role),
+                               entry.get("verifier"), password)
+    return users
+
+# ---------- STORE ----------
+
+class CredentialStore:
+    """Users indexed by name with precomputed salted verifiers.
+
+    Built once per process and rebuilt only when the users file changes or
+    ``invalidate`` is called (e.g. on a secrets change), so a login is one
+    dict lookup and one PBKDF2 hash however many users there are. Plain
+    passwords from secrets are hashed on a user's first login and memoized.
+    ``secret_users`` is a callable returning the secrets ``[users]`` table.
+    """
+
+    def __init__(self, users_file=USERS_FILE, secret_users=None):
+        self.users_file = users_file
+        self._secret_users = secret_users
+        self._snapshot = ConfigSnapshot([users_file], self._load)
+        self._derived = {}  # (username, password) -> verifier, for plain secrets
+        self._lock = threading.Lock()
+
+    def _load(self):
+        users = {}
+        for username, entry in read_users_file(self.users_file).items():
+            if entry.get("verifier"):
+                users[username] = User(username, entry.get("name", username),
+                                       entry.get("role", "client"), entry["verifier"])
+        table = {}
+        if self._secret_users is not None:
+            try:
+                table = self._secret_users()
+            except Exception:
+                table = {}  # no secrets configured
+        users.update(_secret_users(table))
+        return users
+
+    def invalidate(self):
+        self._snapshot.invalidate()
+
+    def get(self, username):
+        return self._snapshot.get().get(username)
+
+    def usernames(self, role=None):
+        return sorted(u.username for u in self._snapshot.get().values() if role in (None, u.role))
+
+    def __len__(self):
+        return len(self._snapshot.get())
+
+    def _verifier(self, user):
+        if user.verifier:
+            return user.verifier
+        key = (user.username, user.password)
+        with self._lock:
+            verifier = self._derived.get(key)
+        if verifier is None:
+            verifier = make_verifier(user.password)
+            with self._lock:
+                verifier = self._derived.setdefault(key, verifier)
+        return verifier
+
+    def verify(self, username, password, override=None):
+        """The ``User`` if ``password`` is right, else None.
+
+        ``override`` is the verifier of a replacement password currently in
+        force for the user (admin reset); it is checked instead of theirs.
+        """
+        user = self.get(username)
+        if user is None:
+            check_password(password, _dummy_verifier())
+            return None
+        return user if check_password(password, override or self._verifier(user)) else None
+
+# ---------- OVERRIDES ----------
+
+class OverrideManager:
+    """Admin password resets shared by every session, indexed by expiry.
+
+    Overrides live in the admin settings file as ``password_overrides``
+    (``{user: {verifier, timestamp}}``) and last ``override_expiry_hours``.
+    A heap of ``(set at, user)`` yields the next to expire, so expired
+    entries are dropped lazily without scanning; replaced entries stay in
+    the heap until they surface. Changes made inside ``batch()`` are saved
+    in one atomic write when the outermost batch ends, merged over whatever
+    the file holds by then.
+    """
+
+    def __init__(self, config):
+        self.config = config  # JsonConfig of the admin settings
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._entries = {}  # user -> (set at, verifier)
+        self._heap = []
+        self._raw = None  # password_overrides the index was built from
+        self._changes = {}  # unsaved: user -> (set at, verifier); verifier None = expired
+        self._cleared = False  # unsaved "remove all", applied before _changes
+        self._pending = {}  # unsaved settings
+        self._version = None
+        self._dirty = False
+
+    # --- index
+
+    def _sync(self):
+        # caller holds _lock; rebuilt only when password_overrides itself changed on disk
+        settings = self.config.get()
+        if self._version == self.config.version:
+            return
+        self._version = self.config.version
+        raw = settings.get("password_overrides") or {}
+        if raw == self._raw:
+            return
+        self._raw = raw
+        entries, migrated = {}, False
+        if not self._cleared:
+            for user, info in raw.items():
+                try:
+                    set_at = datetime.fromisoformat(info["timestamp"])
+                    verifier = info.get("verifier")
+                    if not verifier:  # older plain entries: hashed and saved once
+                        verifier = make_verifier(info["password"])
+                        self._changes.setdefault(user, (set_at, verifier))
+                        migrated = True
+                except (KeyError, TypeError, ValueError):
+                    continue
+                entries[user] = (set_at, verifier)
+        for user, (set_at, verifier) in self._changes.items():
+            if verifier is not None:
+                entries[user] = (set_at, verifier)
+            elif entries.get(user, (None,))[0] == set_at:
+                del entries[user]  # an expiry never removes a newer override
+        self._entries = entries
+        self._heap = [(set_at, user) for user, (set_at, _) in entries.items()]
+        heapq.heapify(self._heap)
+        if migrated:
+            self._changed()
+
+    @property
+    def expiry_hours(self):
+        if "override_expiry_hours" in self._pending:
+            return self._pending["override_expiry_hours"]
+        return self.config.get().get("override_expiry_hours", DEFAULT_OVERRIDE_HOURS)
+
+    def _expire(self, now):
+        # caller holds _lock
+        cutoff = (now or datetime.now()) - timedelta(hours=self.expiry_hours)
+        expired = []
+        while self._heap and self._heap[0][0] < cutoff:
+            set_at, user = heapq.heappop(self._heap)
+            entry = self._entries.get(user)
+            if entry is not None and entry[0] == set_at:
+                self._remove(user)
+                expired.append(user)
+        if expired:
+            self._changed()
+        return expired
+
+    def _put(self, user, entry):
+        self._entries[user] = entry
+        self._changes[user] = entry
+        heapq.heappush(self._heap, (entry[0], user))
+
+    def _remove(self, user):
+        set_at, _ = self._entries.pop(user)
+        self._changes[user] = (set_at, None)
+
+    # --- persistence
+
+    @contextmanager
+    def batch(self):
+        """Group changes (e.g. one admin interaction) into a single save."""
+        depth = getattr(self._local, "depth", 0)
+        self._local.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self.flush()
+
+    def _changed(self):
+        self._dirty = True  # saved when the outermost batch ends
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            # re-read the file so overrides written elsewhere since the last sync survive
+            self.config.invalidate()
+            self._sync()
+            settings = thaw(self.config.get())
+            settings.update(self._pending)
+            overrides = {
+                user: {"verifier": verifier, "timestamp": set_at.isoformat()}
+                for user, (set_at, verifier) in self._entries.items()
+            }
+            if overrides:
+                settings["password_overrides"] = overrides
+            else:
+                settings.pop("password_overrides", None)
+            saved = self.config.save(settings)
+            self._version = self.config.version
+            self._raw = saved.get("password_overrides") or {}
+            self._changes = {}
+            self._cleared = False
+            self._pending = {}
+            self._dirty = False
+
+    # --- public
+
+    def get(self, username, now=None):
+        """Verifier of ``username``'s override if one is in force."""
+        with self.batch(), self._lock:
+            self._sync()
+            self._expire(now)
+            entry = self._entries.get(username)
+            return entry[1] if entry else None
+
+    def expire(self, now=None):
+        """Drop overrides past their expiry; returns the affected users."""
+        with self.batch(), self._lock:
+            self._sync()
+            return self._expire(now)
+
+    def active(self, now=None):
+        """``[(user, set at, seconds left)]``, soonest to expire first."""
+        now = now or datetime.now()
+        with self.batch(), self._lock:
+            self._sync()
+            self._expire(now)
+            max_age = self.expiry_hours * 3600
+            return [
+                (user, set_at, max_age - (now - set_at).total_seconds())
+                for user, (set_at, _) in sorted(self._entries.items(), key=lambda kv: kv[1][0])
+            ]
+
+    def set(self, username, password, now=None):
+        verifier = make_verifier(password)  # outside the lock: deliberately slow
+        set_at = now or datetime.now()
+        with self.batch(), self._lock:
+            self._sync()
+            self._put(username, (set_at, verifier))
+            self._changed()
+
+    def clear(self):
+        with self.batch(), self._lock:
+            self._sync()
+            if self._entries:
+                self._entries.clear()
+                self._heap.clear()
+                self._changes = {}
+                self._cleared = True
+                self._changed()
+
+    def set_expiry_hours(self, hours):
+        with self.batch(), self._lock:
+            self._sync()
+            if hours != self.expiry_hours:
+                self._pending["override_expiry_hours"] = hours
+                self._changed()
+
+# ---------- CLI ----------
+
+def _cli(argv=None):
+    parser = argparse.ArgumentParser(description="Manage login accounts in the users file.")
+    parser.add_argument("--file", default=USERS_FILE)
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_set = sub.add_parser("set", help="add a user or change their password (prompted)")
+    p_set.add_argument("username")
+    p_set.add_argument("--name")
+    p_set.add_argument("--role", choices=ROLES)
+    p_set.add_argument("--password-stdin", action="store_true", help="read the password from stdin")
+    p_rm = sub.add_parser("remove", help="delete a user")
+    p_rm.add_argument("username")
+    sub.add_parser("list", help="show users (never passwords)")
+    args = parser.parse_args(argv)
+
+    users = read_users_file(args.file)
+    if args.command == "list":
+        for username, entry in sorted(users.items()):
+            print(f"{username:<24}{entry.get('role', 'client'):<8}{entry.get('name', '')}")
+        return 0
+    if args.command == "remove":
+        if users.pop(args.username, None) is None:
+            print(f"No user {args.username!r} in {args.file}", file=sys.stderr)
+            return 1
+        atomic_write_json(args.file, {"users": users})
+        print(f"Removed {args.username}")
+        return 0
+
+    if args.password_stdin:
+        password = sys.stdin.readline().rstrip("\n")
+    else:
+        password = getpass.getpass(f"Password for {args.username}: ")
+        if password != getpass.getpass("Repeat password: "):
+            print("Passwords do not match", file=sys.stderr)
+            return 1
+    if not password:
+        print("Empty password refused", file=sys.stderr)
+        return 1
+    entry = users.get(args.username, {})
+    users[args.username] = {
+        "name": args.name or entry.get("name", args.username),
+        "role": args.role or entry.get("role", "client"),
+        "verifier": make_verifier(password),
+    }
+    atomic_write_json(args.file, {"users": users})
+    print(f"Saved {args.username} ({users[args.username]['role']}) to {args.file}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(_cli())
@@ -0,0 +1,245 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from batch_render import ZipSink, render_many, unique_name
+from portfolio_pdf import RenderResult, render_portfolio
+from render_cache import pdf_etag, portfolio_key
+from render_pool import get_render_pool
+from telemetry import record_render, span
+
+# Exports run off the Streamlit script thread so reruns stay responsive and
+# a stray widget interaction cannot discard a build in progress.
+EXPORT_WORKERS = 2
+JOB_TTL_SECONDS = 15 * 60
+MAX_FINISHED_JOBS = 64
+
+JOB_STATES = ("queued", "building", "done", "failed")
+
+# Bulk exports keep at most this many PDFs in memory (rendering or waiting
+# to be zipped) when rendering in-process; a renderer pool uses 2 x workers.
+BULK_IN_FLIGHT = 4
+# Bulk archives live here; leftovers of a crashed or restarted server are
+# swept when the job runner starts
+BULK_ARCHIVE_DIR = os.path.join(tempfile.gettempdir(), "portfolio-exports")
+
+# ---------- JOB RECORDS ----------
+
+@dataclass
+class ExportJob:
+    id: str
+    theme: str
+    state: str = "queued"
+    phase: str = "queued"
+    progress: float = 0.0
+    result: RenderResult = None
+    created: float = field(default_factory=time.time)
+    finished: float = None
+    # bulk exports: a zip on disk instead of result.pdf
+    archive: str = None
+    total: int = 1
+    completed: int = 0
+    failed: int = 0
+    delivered: bool = False
+    etag: str = None  # single exports: content tag of result.pdf
+    archive_data: bytes = field(default=None, repr=False)
+
+    @property
+    def active(self):
+        return self.state in ("queued", "building")
+
+    def archive_bytes(self):
+        """The finished zip, read from disk once per job (None once it has expired)."""
+        if self.archive_data is None:
+            try:
+                with open(self.archive, "rb") as f:
+                    self.archive_data = f.read()
+            except OSError:
+                return None
+        return self.archive_data
+
+_jobs = {}
+_jobs_lock = threading.Lock()
+_executor = None
+
+def _get_executor():
+    global _executor
+    with _jobs_lock:
+        if _executor is None:
+            # with a renderer pool these threads only wait on worker processes
+            pool = get_render_pool()
+            workers = max(EXPORT_WORKERS, pool.workers if pool else 0)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="export")
+            _sweep_archives(time.time())
+        return _executor
+
+def _sweep_archives(now):
+    # anything older than a job's lifetime belongs to no live job in any process
+    try:
+        names = os.listdir(BULK_ARCHIVE_DIR)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(BULK_ARCHIVE_DIR, name)
+        try:
+            if now - os.path.getmtime(path) > JOB_TTL_SECONDS:
+                os.unlink(path)
+        except OSError:
+            pass  # removed by another process
+
+def _prune(now):
+    # caller holds _jobs_lock
+    finished = sorted(
+        (job for job in _jobs.values() if job.finished is not None),
+        key=lambda job: job.finished,
+    )
+    for i, job in enumerate(finished):
+        if now - job.finished > JOB_TTL_SECONDS or len(finished) - i > MAX_FINISHED_JOBS:
+            del _jobs[job.id]
+            if job.archive and os.path.exists(job.archive):
+                os.unlink(job.archive)
+
+# ---------- SPECS ----------
+
+def portfolio_spec(data):
+    """Copy of portfolio data that is safe to hand to another thread.
+
+    Uploaded files are read into bytes now; the widgets' buffers belong to
+    the session and may be replaced by the next rerun.
+    """
+    spec = {}
+    for key, value in data.items():
+        if key.endswith("_images"):
+            value = [f if isinstance(f, bytes) else f.getvalue() for f in value or []]
+        elif key.endswith("_file") and value is not None and not isinstance(value, bytes):
+            value = value.getvalue()
+        spec[key] = value
+    return spec
+
+# ---------- RUNNER ----------
+
+def _run(job, spec, cache):
+    def progress(phase, fraction):
+        job.phase = phase
+        job.progress = fraction
+
+    job.state = "building"
+    key = portfolio_key(job.theme, spec) if cache is not None else None
+    pool = get_render_pool()
+    rendered = []
+
+    def render():
+        if pool is not None:
+            # per-phase progress stays in the worker process
+            progress("rendering", 0.0)
+            result = pool.render(job.theme, spec)
+        else:
+            result = render_portfolio(theme=job.theme, progress=progress, **spec)
+        rendered.append(result)
+        return result.pdf if result.ok else None
+
+    pdf = cache.get_or_render(key, render) if key else render()
+    result = rendered[0] if rendered else RenderResult(pdf=pdf)
+    record_render(result, cache_hit=not rendered)
+    if result.ok:
+        job.etag = pdf_etag(result.pdf)
+    job.result = result
+    job.phase = "done"
+    job.progress = 1.0
+    job.finished = time.time()
+    job.state = "done" if result.ok else "failed"
+
+def _run_safely(job, spec, cache):
+    try:
+        _run(job, spec, cache)
+    except Exception as e:  # never leave a job stuck in "building"
+        job.result = RenderResult(error=f"Export failed: {e}")
+        job.finished = time.time()
+        job.state = "failed"
+
+def submit_export(theme, spec, cache=None):
+    """Queue a portfolio render; returns the job id to poll with get_job()."""
+    job = ExportJob(id=uuid.uuid4().hex, theme=theme)
+    with _jobs_lock:
+        _prune(time.time())
+        _jobs[job.id] = job
+    _get_executor().submit(_run_safely, job, portfolio_spec(spec), cache)
+    return job.id
+
+def _run_bulk(job, items, cache):
+    job.state = "building"
+    pool = get_render_pool()
+    result = RenderResult()
+    os.makedirs(BULK_ARCHIVE_DIR, exist_ok=True)
+    fd, job.archive = tempfile.mkstemp(prefix="portfolios-", suffix=".zip", dir=BULK_ARCHIVE_DIR)
+    os.close(fd)
+    sink = ZipSink(job.archive)
+    used = set()
+
+    def record(name, rendered, cache_hit=False):
+        record_render(rendered, cache_hit=cache_hit)
+        if rendered.ok:
+            with span("deliver"):
+                sink.write(name, rendered.pdf)
+            result.pages += rendered.pages
+        else:
+            job.failed += 1
+            result.warnings.append(f"{name}: {rendered.error}")
+        result.warnings.extend(f"{name}: {w}" for w in rendered.warnings)
+        job.completed += 1
+        job.progress = job.completed / job.total
+        job.phase = f"{job.completed}/{job.total} portfolios"
+
+    def uncached():
+        # cache hits go straight into the archive; only misses are rendered
+        for name, theme, spec in items:
+            name = unique_name(name, used)
+            key = portfolio_key(theme, spec) if cache is not None else None
+            pdf = cache.get(key) if key else None
+            if pdf is not None:
+                record(name, RenderResult(pdf=pdf), cache_hit=True)
+            else:
+                yield (name, key), theme, spec
+
+    try:
+        for (name, key), rendered in render_many(uncached(), pool, None if pool else BULK_IN_FLIGHT):
+            if key and rendered.ok:
+                cache.put(key, rendered.pdf)
+            record(name, rendered)
+    finally:
+        sink.close()
+    if job.failed == job.total:
+        result.error = "None of the portfolios could be generated"
+    job.result = result
+    job.finished = time.time()
+    job.state = "failed" if result.error else "done"
+
+def _run_bulk_safely(job, items, cache):
+    try:
+        _run_bulk(job, items, cache)
+    except Exception as e:
+        job.result = RenderResult(error=f"Bulk export failed: {e}")
+        job.finished = time.time()
+        job.state = "failed"
+
+def submit_bulk_export(items, cache=None):
+    """Queue ``(name, theme, spec)`` renders into one zip; returns the job id.
+
+    PDFs are appended to a temporary archive as they finish, so only a few
+    are in memory at any time; the archive is removed when the job expires.
+    """
+    items = [(name, theme, portfolio_spec(spec)) for name, theme, spec in items]
+    job = ExportJob(id=uuid.uuid4().hex, theme="bulk", total=max(len(items), 1))
+    with _jobs_lock:
+        _prune(time.time())
+        _jobs[job.id] = job
+    _get_executor().submit(_run_bulk_safely, job, items, cache)
+    return job.id
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
@@ -1,6 +1,155 @@
-def main():
-    print("Hello from ai-consultant!")
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import date
 
+from batch_render import open_sink, percentiles, render_many, unique_name
+from branding_store import PRESET_DB_FILE, PresetRepository
+from render_pool import DEFAULT_MAX_TASKS, RenderPool
+
+# Headless batch rendering: no Streamlit imports anywhere on this path.
+
+PRESET_KEYS = ("name", "brand_color", "font_choice", "pdf_theme", "logo_sha256")
+THEMES = ("Light", "Dark")
+PRESET_JSON_FILE = "branding_presets.json"  # imported once, as the app does
+
+# ---------- SPECS ----------
+
+def iter_spec_files(path):
+    """Yield ``(label, raw_spec, base_dir)`` from a JSONL file or a directory.
+
+    A directory may hold ``*.json`` files (one spec each) and ``*.jsonl``
+    files. Image and ``*_file`` paths are resolved relative to the file they
+    appear in.
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, f) for f in os.listdir(path)
+            if f.endswith((".json", ".jsonl"))
+        )
+    else:
+        files = [path]
+    for file in files:
+        base_dir = os.path.dirname(os.path.abspath(file))
+        name = os.path.splitext(os.path.basename(file))[0]
+        with open(file, "r", encoding="utf-8") as f:
+            if file.endswith(".json"):
+                yield name, f.read(), base_dir
+                continue
+            for lineno, line in enumerate(f, 1):
+                if line.strip():
+                    yield f"{name}:{lineno}", line, base_dir
+
+def _read_file(path, base_dir):
+    with open(os.path.join(base_dir, path), "rb") as f:
+        return f.read()
+
+def _read_images(paths, base_dir):
+    return [_read_file(p, base_dir) for p in paths or []]
+
+def build_spec(raw, base_dir, repo, default_theme="Light"):
+    """Turn one decoded spec into ``(output_name, theme, render_kwargs)``.
+
+    Preset fields (brand, font, theme, logo) are the defaults; anything set
+    in the spec itself wins.
+    """
+    spec = json.loads(raw) if isinstance(raw, str) else dict(raw)
+    kwargs = {}
+    preset = spec.pop("preset", None)
+    if preset:
+        fields = repo.get(preset)
+        if fields is None:
+            raise ValueError(f"unknown preset {preset!r}")
+        kwargs.update({k: fields[k] for k in PRESET_KEYS if fields.get(k)})
+
+    output = spec.pop("output", None) or spec.pop("id", None)
+    theme = spec.pop("theme", None) or kwargs.pop("pdf_theme", None) or default_theme
+    kwargs.pop("pdf_theme", None)
+    if theme not in THEMES:
+        raise ValueError(f"unknown theme {theme!r}")
+
+    for key, value in spec.items():
+        if key.endswith("_images"):
+            value = _read_images(value, base_dir)
+        elif key.endswith("_file") and value:
+            value = _read_file(value, base_dir)
+        elif key == "date" and isinstance(value, str):
+            try:
+                value = date.fromisoformat(value)
+            except ValueError:
+                pass
+        kwargs[key] = value
+    name = output or kwargs.get("project_title") or preset or "portfolio"
+    return name, theme, kwargs
+
+# ---------- CLI ----------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render portfolio PDFs from spec files.")
+    parser.add_argument("specs", help="JSONL file, or directory of .json/.jsonl spec files")
+    parser.add_argument("-o", "--output", default="portfolios",
+                        help="output directory, or a .zip archive (default: portfolios)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="renderer processes; 0 renders in this process")
+    parser.add_argument("--max-tasks", type=int, default=DEFAULT_MAX_TASKS,
+                        help="renders before a worker process is replaced (0 = never)")
+    parser.add_argument("--in-flight", type=int, default=None,
+                        help="specs rendering or waiting to be written at once (default: 2 x workers)")
+    parser.add_argument("--theme", choices=THEMES, default="Light",
+                        help="theme for specs without one (or a preset theme)")
+    parser.add_argument("--db", default=PRESET_DB_FILE, help="branding preset library")
+    args = parser.parse_args(argv)
+
+    repo = PresetRepository(args.db)
+    repo.bootstrap_from_json(PRESET_JSON_FILE)
+    failures = []
+    used_names = set()
+
+    def items():
+        for label, raw, base_dir in iter_spec_files(args.specs):
+            try:
+                name, theme, kwargs = build_spec(raw, base_dir, repo, args.theme)
+            except Exception as e:
+                failures.append(label)
+                print(f"FAIL {label}: invalid spec: {e}", flush=True)
+                continue
+            yield (label, unique_name(name, used_names)), theme, kwargs
+
+    pool = RenderPool(args.workers, args.max_tasks) if args.workers > 0 else None
+    sink = open_sink(args.output)
+    latencies = []
+    pages = rendered_bytes = 0
+    started = time.perf_counter()
+    try:
+        for (label, filename), result in render_many(items(), pool, args.in_flight):
+            for warning in result.warnings:
+                print(f"WARN {label}: {warning}", flush=True)
+            if not result.ok:
+                failures.append(label)
+                print(f"FAIL {label}: {result.error}", flush=True)
+                continue
+            sink.write(filename, result.pdf)
+            latencies.append(result.elapsed)
+            pages += result.pages
+            rendered_bytes += len(result.pdf)
+            print(f"ok   {label} -> {filename} ({result.pages} pages, {result.elapsed * 1000:.0f} ms)",
+                  flush=True)
+    finally:
+        sink.close()
+        if pool is not None:
+            pool.shutdown()
+    wall = time.perf_counter() - started
+
+    done = len(latencies)
+    p = percentiles(latencies)
+    print(
+        f"\n{done} rendered, {len(failures)} failed in {wall:.2f}s "
+        f"({done / wall if wall else 0:.2f} docs/s, {pages} pages, {rendered_bytes / 1e6:.2f} MB) -> {args.output}"
+    )
+    print(f"latency p50 {p[50] * 1000:.0f} ms, p90 {p[90] * 1000:.0f} ms, p99 {p[99] * 1000:.0f} ms")
+    return 1 if failures else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,984 @@
+from reportlab.platypus import (
+    BaseDocTemplate, PageTemplate, Frame, Paragraph, Spacer, Table, TableStyle,
+    PageBreak, Image, KeepTogether, ListFlowable, ListItem, Flowable, LongTable
+)
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
+from reportlab.lib import colors
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from io import BytesIO, StringIO
+import base64
+import csv
+import hashlib
+import os
+import re
+import threading
+import time
+from types import MappingProxyType
+
+from branding_store import load_rendition
+from telemetry import collect, count, span
+
+# PDF rendering core. Kept free of Streamlit so it can run in worker
+# threads/processes and headless tools; problems come back as data.
+
+# ---------- THEME HELPERS ----------
+
+# Palettes, paragraph styles and table styles are built once per key and
+# shared by every build and thread; treat them as read-only.
+
+@lru_cache(maxsize=None)
+def _theme_colors(theme="Light"):
+    if theme == "Dark":
+        return MappingProxyType({
+            "text": colors.HexColor("#F8FAFC"),
+            "title": colors.HexColor("#FFD700"),
+            "heading": colors.HexColor("#38BDF8"),
+            "accent": colors.HexColor("#FFD700"),
+            "band": colors.HexColor("#0B1220"),
+            "table_bg": colors.HexColor("#111827"),
+            "table_alt": colors.HexColor("#1E293B")
+        })
+    return MappingProxyType({
+        "text": colors.HexColor("#1A365D"),
+        "title": colors.HexColor("#1E3A8A"),
+        "heading": colors.HexColor("#38BDF8"),
+        "accent": colors.HexColor("#FFD700"),
+        "band": colors.HexColor("#EEF2FF"),
+        "table_bg": colors.whitesmoke,
+        "table_alt": colors.HexColor("#F3F4F6")
+    })
+
+@lru_cache(maxsize=32)
+def _make_styles(theme="Light", base_font="Helvetica"):
+    styles = getSampleStyleSheet()
+    palette = _theme_colors(theme)
+
+    # Base body
+    body = ParagraphStyle(
+        "Body",
+        parent=styles["Normal"],
+        fontName=base_font,
+        fontSize=11.5,
+        leading=16,
+        textColor=palette["text"],
+        spaceBefore=6,
+        spaceAfter=6,
+        alignment=TA_JUSTIFY,
+    )
+    # Title
+    title = ParagraphStyle(
+        "TitleX",
+        parent=styles["Title"],
+        fontName="Helvetica-Bold",
+        fontSize=28,
+        leading=32,
+        textColor=palette["title"],
+        alignment=TA_CENTER,
+        spaceAfter=18,
+    )
+    # Subtitle/Header line
+    h2 = ParagraphStyle(
+        "H2",
+        parent=styles["Heading2"],
+        fontName="Helvetica-Bold",
+        fontSize=16,
+        leading=20,
+        textColor=palette["heading"],
+        spaceBefore=18,
+        spaceAfter=8,
+    )
+    # Small footer text
+    small = ParagraphStyle(
+        "Small",
+        parent=styles["Normal"],
+        fontName=base_font,
+        fontSize=9.5,
+        leading=12,
+        textColor=palette["heading"],
+        alignment=TA_CENTER,
+    )
+    # Bullet items
+    bullet = ParagraphStyle(
+        "Bullet",
+        parent=body,
+        leftIndent=0,
+        spaceBefore=2,
+        spaceAfter=2,
+    )
+    return MappingProxyType(
+        {"body": body, "title": title, "h2": h2, "small": small, "bullet": bullet, "palette": palette}
+    )
+
+# ---------- PAGE DECORATIONS ----------
+
+def _draw_heart(canvas_obj, x, y, s=8, color=colors.HexColor("#EF4444")):
+    # Simple vector heart: two circles + triangle
+    canvas_obj.saveState()
+    canvas_obj.setFillColor(color)
+    r = s * 0.35
+    # left bump
+    canvas_obj.circle(x - r, y, r, fill=1, stroke=0)
+    # right bump
+    canvas_obj.circle(x + r, y, r, fill=1, stroke=0)
+    # point
+    p = canvas_obj.beginPath()
+    p.moveTo(x - 2*r, y)
+    p.lineTo(x + 2*r, y)
+    p.lineTo(x, y - 2.2*r)
+    p.close()
+    canvas_obj.drawPath(p, fill=1, stroke=0)
+    canvas_obj.restoreState()
+
+def add_watermark(canvas_obj, doc, theme="Light", logo=None):
+    # logo: ImageReader, file path or binary stream
+    canvas_obj.saveState()
+    
+    # 8% tints pre-blended onto the white page: form XObjects (PageChrome)
+    # cannot carry the ExtGState an alpha colour needs
+    if theme == "Dark":
+        wm_color = colors.Color(1, 1, 1)
+    else:
+        wm_color = colors.Color(0.928, 0.936, 0.96)
+    
+    if isinstance(logo, str) and not os.path.exists(logo):
+        logo = None
+    
+    if logo is not None:
+        logo = ImageReader(logo)
+        canvas_obj.translate(150, 250)
+        canvas_obj.rotate(30)
+        canvas_obj.drawImage(logo, 0, 0, width=300, height=300, mask='auto')
+    else:
+        canvas_obj.setFont("Helvetica-Bold", 60)
+        canvas_obj.setFillColor(wm_color)
+        canvas_obj.translate(300, 400)
+        canvas_obj.rotate(45)
+        canvas_obj.drawCentredString(0, 0, "PyStatRPlus")
+    
+    canvas_obj.restoreState()
+
+def _footer(canvas_obj, doc, theme="Light"):
+    palette = _theme_colors(theme)
+    canvas_obj.saveState()
+    w = doc.width
+    x = doc.leftMargin
+    y = 0.55 * inch
+
+    # subtle divider
+    canvas_obj.setStrokeColor(palette["accent"])
+    canvas_obj.setLineWidth(0.8)
+    canvas_obj.line(x, y + 12, x + w, y + 12)
+
+    # "Built with ♥ by PyStatR+!" (italicized in deep blue)
+    text = "Built with  by PyStatR+!"
+    canvas_obj.setFillColor(colors.HexColor("#1E3A8A"))  # Deep blue color
+    canvas_obj.setFont("Helvetica-Oblique", 9.5)  # Italic font
+    tw = canvas_obj.stringWidth(text, "Helvetica-Oblique", 9.5)
+    cx = doc.leftMargin + (doc.width / 2.0) - (tw / 2.0)
+    canvas_obj.drawString(cx, y, text)
+    # draw the heart over the gap after "with "
+    heart_x = cx + canvas_obj.stringWidth("Built with ", "Helvetica-Oblique", 9.5) + 5
+    heart_y = y + 4
+    _draw_heart(canvas_obj, heart_x, heart_y, s=9, color=colors.HexColor("#EF4444"))
+
+    canvas_obj.restoreState()
+
+def _page_number(canvas_obj, doc, theme="Light"):
+    palette = _theme_colors(theme)
+    canvas_obj.saveState()
+    canvas_obj.setFillColor(palette["heading"])
+    canvas_obj.setFont("Helvetica", 8.5)
+    canvas_obj.drawRightString(doc.leftMargin + doc.width, 0.55 * inch, str(doc.page))
+    canvas_obj.restoreState()
+
+class PageChrome:
+    """Watermark + footer recorded once per document as a PDF form XObject.
+
+    Every page then stamps the form by reference (one ``doForm``); only the
+    per-page fields (page number) are drawn directly.
+    """
+
+    def __init__(self, theme="Light", logo=None, logo_key=None, page_numbers=False):
+        self.theme = theme
+        self.logo = logo
+        self.page_numbers = page_numbers
+        self.form_name = f"Chrome{theme}{(logo_key or 'Text')[:16]}"
+
+    def stamp(self, canvas_obj, doc):
+        if not canvas_obj.hasForm(self.form_name):
+            canvas_obj.beginForm(self.form_name)
+            add_watermark(canvas_obj, doc, theme=self.theme, logo=self.logo)
+            _footer(canvas_obj, doc, self.theme)
+            canvas_obj.endForm()
+        canvas_obj.doForm(self.form_name)
+        if self.page_numbers:
+            _page_number(canvas_obj, doc, self.theme)
+
+def _on_page(canvas_obj, doc, chrome):
+    with span("page"):
+        chrome.stamp(canvas_obj, doc)
+
+def _on_cover(canvas_obj, doc, chrome):
+    # cover shares the same footer/watermark form
+    with span("page"):
+        chrome.stamp(canvas_obj, doc)
+
+# ---------- CONTENT HELPERS ----------
+
+def _bullet_lines(text):
+    return [ln.strip("• ").strip("- ").strip() for ln in (text or "").split("\n") if ln.strip()]
+
+def _bulleted_list(text, style):
+    lines = _bullet_lines(text)
+    if not lines:
+        return None
+    return _list_flowable([Paragraph(line, style) for line in lines])
+
+def _list_flowable(paragraphs):
+    items = [ListItem(p, leftIndent=6) for p in paragraphs]
+    return ListFlowable(
+        items,
+        bulletType="bullet",
+        start="circle",
+        bulletFontName="Helvetica",
+        bulletFontSize=10,
+        bulletIndent=0,
+        leftIndent=12,
+        spaceBefore=4,
+        spaceAfter=6,
+    )
+@lru_cache(maxsize=None)
+def _accent_bar_style(theme="Light"):
+    return TableStyle([("BACKGROUND", (0, 0), (-1, -1), _theme_colors(theme)["heading"])])
+
+# ---------- SCENARIO TABLES ----------
+
+# Scenario rows come from the pipe-delimited text box or an uploaded
+# CSV/TSV file. Cells that fit on one line are drawn as plain strings; only
+# wrapping or marked-up cells become Paragraphs. Long tables are streamed
+# into LongTables a window of rows at a time, so a page break re-measures
+# at most a window instead of the whole rest of the table.
+
+SCENARIO_HEADERS = ("Option", "Investment", "Benefits", "Risks", "Recommendation")
+SCENARIO_COL_FRACTIONS = (0.18, 0.16, 0.26, 0.26, 0.14)
+# first page's window; each later one is sized from the rows the page before held
+SCENARIO_WINDOW_ROWS = 8
+SCENARIO_CELL_PADDING = 8  # LEFTPADDING + RIGHTPADDING
+
+@lru_cache(maxsize=None)
+def _scenario_cell_styles(theme="Light"):
+    """(body cell, header cell) paragraph styles for the scenario table."""
+    palette = _theme_colors(theme)
+    # Wrap text in Paragraphs for proper text wrapping
+    style = ParagraphStyle(
+        "TableCell",
+        fontName="Helvetica",
+        fontSize=9,
+        leading=11,
+        alignment=TA_LEFT,
+        textColor=palette["text"]
+    )
+    
+    header_style = ParagraphStyle(
+        "TableHeader",
+        fontName="Helvetica-Bold",
+        fontSize=9,
+        leading=11,
+        alignment=TA_CENTER,
+        textColor=colors.HexColor("#1E3A8A")
+    )
+    return style, header_style
+
+@lru_cache(maxsize=None)
+def _scenario_table_style(theme="Light", flipped=False):
+    """Table style; ``flipped`` starts the banding on the alternate colour."""
+    palette = _theme_colors(theme)
+    bands = [palette["table_bg"], palette["table_alt"]]
+    return TableStyle([
+        # header - Gold gradient background with deep blue text
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#FFD700")),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, 0), 9),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.HexColor("#1E3A8A")),
+        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+        ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, 0), 8),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+        # body
+        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+        ("FONTSIZE", (0, 1), (-1, -1), 9),
+        ("TEXTCOLOR", (0, 1), (-1, -1), palette["text"]),
+        ("ALIGN", (0, 1), (-1, -1), "LEFT"),
+        ("VALIGN", (0, 1), (-1, -1), "TOP"),
+        ("TOPPADDING", (0, 1), (-1, -1), 6),
+        ("BOTTOMPADDING", (0, 1), (-1, -1), 6),
+        ("LEADING", (0, 0), (-1, -1), 11),  # plain-string cells, as the cell paragraphs
+        ("LEFTPADDING", (0, 0), (-1, -1), 4),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), bands[::-1] if flipped else bands),
+        ("GRID", (0, 0), (-1, -1), 0.6, colors.HexColor("#FFD700")),  # Gold borders
+    ])
+
+def parse_scenarios(text):
+    """Scenario rows of five cells from pipe-delimited, tab-separated or CSV text.
+
+    The format is taken from the first non-blank line. A header row naming
+    the columns is skipped and rows with fewer than five cells are ignored.
+    """
+    text = text or ""
+    first = next((ln for ln in text.splitlines() if ln.strip()), "")
+    if "|" in first:
+        rows = (ln.split("|") for ln in text.split("\n") if "|" in ln)
+    else:
+        rows = csv.reader(StringIO(text), delimiter="\t" if "\t" in first else ",")
+    parsed = [[cell.strip() for cell in row[:5]] for row in rows if len(row) >= 5]
+    if parsed and [c.lower() for c in parsed[0]] == [h.lower() for h in SCENARIO_HEADERS]:
+        del parsed[0]
+    return parsed
+
+def scenario_text(kwargs):
+    """Scenario source for a build: an uploaded ``scenarios_file`` wins over ``scenarios``."""
+    data = kwargs.get("scenarios_file")
+    if not data:
+        return kwargs.get("scenarios")
+    if hasattr(data, "getvalue"):
+        data = data.getvalue()
+    if isinstance(data, (bytes, bytearray)):
+        try:
+            return bytes(data).decode("utf-8-sig")
+        except UnicodeDecodeError:
+            return bytes(data).decode("cp1252", errors="replace")  # spreadsheet exports
+    return data
+
+def _scenario_cells(rows, theme, doc_width, make=Paragraph):
+    """Header plus body rows; ``make(text, style)`` builds the cells that need wrapping."""
+    style, header_style = _scenario_cell_styles(theme)
+    widths = [doc_width * f - SCENARIO_CELL_PADDING for f in SCENARIO_COL_FRACTIONS]
+
+    def cell(text, cell_style, width):
+        if ("<" not in text and "&" not in text and "\n" not in text
+                and stringWidth(text, cell_style.fontName, cell_style.fontSize) <= width):
+            return text
+        return make(text, cell_style)
+
+    data = [[cell(h, header_style, w) for h, w in zip(SCENARIO_HEADERS, widths)]]
+    for row in rows:
+        data.append([cell(str(c), style, w) for c, w in zip(row, widths)])
+    return data
+
+def _scenario_table(raw, theme="Light", doc_width=450):
+    rows = parse_scenarios(raw)
+    if not rows:
+        return None
+    return _table_flowable(_scenario_cells(rows, theme, doc_width), theme, doc_width)
+
+def _table_flowable(data, theme, doc_width):
+    # Proportional widths
+    col_widths = [doc_width * f for f in SCENARIO_COL_FRACTIONS]
+    if len(data) - 1 > SCENARIO_WINDOW_ROWS:
+        return ScenarioTable(data[0], data[1:], col_widths, theme)
+    t = LongTable(data, colWidths=col_widths, repeatRows=1)
+    t.setStyle(_scenario_table_style(theme))
+    return t
+
+class ScenarioTable(Flowable):
+    """Scenario rows laid out a window at a time.
+
+    Each page is cut from a LongTable of the header and the next
+    ``window`` rows (doubled until it overflows the page); rows further on
+    stay plain data until they are reached. The next window is a little
+    more than the rows the last page held, so wrapping rows are not
+    measured over and over. ``offset`` (rows already placed) keeps the
+    banding continuous.
+    """
+
+    def __init__(self, header, rows, col_widths, theme, window=SCENARIO_WINDOW_ROWS, offset=0):
+        Flowable.__init__(self)
+        self.header = header
+        self.rows = rows
+        self.col_widths = col_widths
+        self.theme = theme
+        self.window = window
+        self.offset = offset
+        self._head = None
+
+    def _table(self, rows):
+        t = LongTable([self.header] + list(rows), colWidths=self.col_widths, repeatRows=1)
+        t.setStyle(_scenario_table_style(self.theme, self.offset % 2 == 1))
+        return t
+
+    def wrap(self, availWidth, availHeight):
+        if self._head is not None and self._head[0] == (availWidth, availHeight):
+            return self.width, self.height
+        # grow the window until it overflows the space (or holds every row)
+        count = self.window
+        while True:
+            table = self._table(self.rows[:count])
+            self.width, self.height = table.wrap(availWidth, availHeight)
+            if self.height > availHeight or count >= len(self.rows):
+                self._head = ((availWidth, availHeight), table)
+                return self.width, self.height
+            count *= 2
+
+    def split(self, availWidth, availHeight):
+        self.wrap(availWidth, availHeight)
+        parts = self._head[1].split(availWidth, availHeight)
+        if len(parts) < 2:
+            return parts
+        placed = len(parts[0]._cellvalues) - 1  # minus the header row
+        rest = self.rows[placed:]
+        window = max(placed + placed // 4 + 1, 2)
+        return [parts[0], ScenarioTable(self.header, rest, self.col_widths, self.theme,
+                                        window, self.offset + placed)]
+
+    def draw(self):
+        self._head[1].drawOn(self.canv, 0, 0)
+
+# ---------- IMAGES ----------
+
+def _image_bytes(img_file):
+    if isinstance(img_file, (bytes, bytearray)):
+        return bytes(img_file)
+    if hasattr(img_file, "getvalue"):
+        return img_file.getvalue()
+    img_file.seek(0)
+    return img_file.read()
+
+class ImageRegistry:
+    """Distinct images of one build, keyed by content hash.
+
+    Each image is opened and measured once, however many sections use it.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, data, digest=None):
+        digest = digest or hashlib.sha256(data).hexdigest()
+        entry = self._entries.get(digest)
+        if entry is None:
+            # ReportLab reads from memory; nothing is written to disk
+            reader = ImageReader(BytesIO(data))
+            iw, ih = reader.getSize()
+            entry = self._entries[digest] = (digest, reader, iw, ih)
+        return entry
+
+class SharedImage(Flowable):
+    """Draws a registry image through a per-document form XObject.
+
+    The pixels are embedded (and digested by ReportLab) on first use only;
+    every other reference is a single ``doForm``.
+    """
+
+    def __init__(self, entry, width, height, hAlign="CENTER"):
+        Flowable.__init__(self)
+        self.digest, self.reader = entry[0], entry[1]
+        self.drawWidth = width
+        self.drawHeight = height
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.drawWidth, self.drawHeight
+
+    def draw(self):
+        canv = self.canv
+        name = f"Img{self.digest[:24]}"
+        if not canv.hasForm(name):
+            canv.beginForm(name, 0, 0, 1, 1)
+            canv.drawImage(self.reader, 0, 0, 1, 1, mask="auto")
+            canv.endForm()
+        canv.saveState()
+        canv.scale(self.drawWidth, self.drawHeight)
+        canv.doForm(name)
+        canv.restoreState()
+
+def _image_flowables(files, max_width, registry=None, warnings=None):
+    """Scale images to fit page width, keep aspect ratio.
+
+    Images that cannot be read are skipped and reported in ``warnings``.
+    """
+    if not files:
+        return []
+    if registry is None:
+        registry = ImageRegistry()
+    flows = []
+    for i, img_file in enumerate(files, 1):
+        try:
+            entry = registry.get(_image_bytes(img_file))
+            iw, ih = entry[2], entry[3]
+            scale = min(max_width / float(iw), 1.0)
+            flows.append(SharedImage(entry, iw * scale, ih * scale))
+            flows.append(Spacer(1, 8))
+        except Exception as e:
+            if warnings is not None:
+                warnings.append(f"Could not process image {getattr(img_file, 'name', f'image {i}')}: {e}")
+    return flows
+
+def _logo_images(kwargs):
+    """Cover and watermark logo bytes for one build, decoded at most once.
+
+    Stored logos use their pre-built renditions; a raw base64 ``logo`` is
+    embedded as is for both.
+    """
+    digest = kwargs.get("logo_sha256")
+    if digest:
+        cover = load_rendition(digest, "cover")
+        watermark = load_rendition(digest, "watermark")
+        if cover and watermark:
+            return cover, watermark
+    if kwargs.get("logo"):
+        raw = base64.b64decode(kwargs["logo"])
+        return raw, raw
+    return None, None
+
+# ---------- TEXT COMPILER ----------
+
+# ReportLab re-wraps the unplaced remainder of a paragraph at every page
+# break, so one paragraph holding a whole section lays out in quadratic
+# time. Free text is compiled to one Paragraph per paragraph instead, and
+# run-on paragraphs are cut into blocks of about TEXT_BLOCK_CHARS.
+
+TEXT_BLOCK_CHARS = 1500
+_MARKUP_SPLIT = re.compile(r"(<[^>]*>)")
+_MARKUP_TAG = re.compile(r"<\s*(/?)\s*([A-Za-z][\w:-]*)[^>]*?(/?)\s*>")
+_VOID_TAGS = {"br", "img", "seqreset", "seqdefault", "pagenumber"}
+# blank line (paragraph end), line break, or the space after a sentence
+_TEXT_BREAK = re.compile(r"\n[ \t]*\n\s*|\n|(?<=[.!?])[ \t]+")
+_PARTIAL_ENTITY = re.compile(r"&[#\w]{0,10}$")
+
+def _text_blocks(content, max_chars=TEXT_BLOCK_CHARS):
+    """Split free-text markup into ``[(markup, starts_paragraph, ends_paragraph)]``.
+
+    Blank lines end a paragraph and single newlines become ``<br/>``, as
+    before. A paragraph longer than ``max_chars`` is cut at its next line
+    break (or, with none, at a sentence end past twice that). Text with
+    neither is cut at its last space before three times ``max_chars``, or
+    right there when it has no spaces. Inline tags open at a cut are closed and
+    reopened so each block parses on its own.
+    """
+    blocks = []
+    open_tags = []  # (name, opening tag) still open at this point
+    state = {"parts": [], "size": 0, "text": False, "starts": True}
+
+    def cut(ends):
+        if state["text"]:
+            closing = "".join(f"</{name}>" for name, _ in reversed(open_tags))
+            blocks.append(["".join(state["parts"]) + closing, state["starts"], ends])
+            state["starts"] = ends
+        elif ends and blocks:
+            blocks[-1][2] = True
+            state["starts"] = True
+        state["parts"] = [tag for _, tag in open_tags]
+        state["size"] = 0
+        state["text"] = False
+
+    def add(text):
+        state["parts"].append(text)
+        state["size"] += len(text)
+        state["text"] = state["text"] or bool(text.strip())
+
+    def add_run(text):
+        # text between breaks: never let one block grow past the hard limit
+        limit = 3 * max_chars
+        while state["size"] + len(text) > limit:
+            room = max(limit - state["size"], 0)
+            space = max(text.rfind(" ", 0, room + 1), text.rfind("\t", 0, room + 1))
+            if space > 0:
+                add(text[:space])
+                text = text[space + 1:]
+            elif state["text"] or room == 0:
+                pass  # start the run in a block of its own
+            else:
+                head = text[:room]
+                partial = _PARTIAL_ENTITY.search(head)  # never split "&amp;" and the like
+                if partial and partial.start() > 0:
+                    head = head[:partial.start()]
+                add(head)
+                text = text[len(head):]
+            cut(False)
+        add(text)
+
+    for i, token in enumerate(_MARKUP_SPLIT.split(content or "")):
+        if i % 2:  # a tag
+            match = _MARKUP_TAG.match(token)
+            state["parts"].append(token)
+            if not match or match.group(3) or match.group(2).lower() in _VOID_TAGS:
+                continue
+            name = match.group(2)
+            if not match.group(1):
+                open_tags.append((name, token))
+                continue
+            for j in range(len(open_tags) - 1, -1, -1):
+                if open_tags[j][0].lower() == name.lower():
+                    del open_tags[j]
+                    break
+            continue
+
+        pos = 0
+        for brk in _TEXT_BREAK.finditer(token):
+            add_run(token[pos:brk.start()])
+            pos = brk.end()
+            gap = brk.group()
+            if gap.count("\n") > 1:
+                cut(True)
+            elif gap == "\n":
+                if state["size"] >= max_chars:
+                    cut(False)
+                else:
+                    add("<br/>")
+            elif state["size"] >= 2 * max_chars:
+                cut(False)
+            else:
+                add(gap)
+        add_run(token[pos:])
+    cut(True)
+    return [tuple(block) for block in blocks]
+
+@lru_cache(maxsize=64)
+def _block_style(style, starts, ends, last):
+    """``style`` with paragraph spacing only where a paragraph starts or ends."""
+    if last:
+        space_after = style.spaceAfter
+    else:
+        # the blank line the text had between paragraphs
+        space_after = style.leading if ends else 0
+    return ParagraphStyle(
+        f"{style.name}-{int(starts)}{int(ends)}{int(last)}",
+        parent=style,
+        spaceBefore=style.spaceBefore if starts else 0,
+        spaceAfter=space_after,
+    )
+
+def _text_paragraphs(content, style, max_chars=TEXT_BLOCK_CHARS):
+    """Parsed paragraphs for a free-text section, one per block."""
+    blocks = _text_blocks(content, max_chars)
+    return [
+        ParsedParagraph(markup, _block_style(style, starts, ends, n == len(blocks) - 1))
+        for n, (markup, starts, ends) in enumerate(blocks)
+    ]
+
+# ---------- SECTION CACHE ----------
+
+# Re-exports usually change one section. Each section compiles to a plan
+# (parsed paragraph fragments, table cells, image sizes) cached by its
+# inputs; layout mutates flowables, so every build makes fresh ones from
+# the plan, which skips ReportLab's markup parser.
+
+SECTIONS = (
+    ("Executive Summary", "exec_summary"),
+    ("Strategic Opportunities", "opportunities"),
+    ("Risk Assessment", "risks"),
+    ("Scenario Analysis", "scenarios"),
+    ("Professional Insights", "reflection"),
+    ("Design Case Study", "logo_text"),
+)
+SECTION_CACHE_SIZE = 256
+
+class ParsedParagraph:
+    """Markup parsed once; ``make()`` returns a fresh Paragraph from the fragments."""
+
+    __slots__ = ("text", "style", "frags", "bullet")
+
+    def __init__(self, text, style):
+        p = Paragraph(text, style)
+        self.text, self.style, self.frags, self.bullet = p.text, p.style, p.frags, p.bulletText
+
+    def make(self):
+        return Paragraph(self.text, self.style, bulletText=self.bullet, frags=self.frags)
+
+class SectionCache:
+    """Compiled section plans, least recently used first out; shared by all threads."""
+
+    def __init__(self, maxsize=SECTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._plans)
+
+    def get(self, key):
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._plans.move_to_end(key)
+            return plan
+
+    def put(self, key, plan):
+        with self._lock:
+            self._plans[key] = plan
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+            self.hits = self.misses = 0
+
+SECTION_CACHE = SectionCache()
+
+def _section_key(key, title, content, image_digests, theme, base_font, doc_width):
+    content_digest = hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+    return (key, title, content_digest, tuple(image_digests), theme, base_font, doc_width)
+
+def _compile_section(title, key, content, images, S, theme, doc_width, registry):
+    """Plan for one section: ``(step, ...)`` tuples; ``images`` is [(digest, bytes)]."""
+    steps = [("para", ParsedParagraph(title, S["h2"]))]
+    if key in ("opportunities", "risks"):
+        lines = _bullet_lines(content)
+        if lines:
+            steps.append(("list", tuple(ParsedParagraph(line, S["bullet"]) for line in lines)))
+    elif key == "scenarios":
+        with span("scenario_table"):
+            rows = parse_scenarios(content)
+            if rows:
+                cells = _scenario_cells(rows, theme, doc_width, make=ParsedParagraph)
+                steps.append(("table", tuple(tuple(row) for row in cells)))
+    elif content:
+        steps.extend(("para", p) for p in _text_paragraphs(content, S["body"]))
+
+    if images:
+        with span("images"):
+            for i, (digest, data) in enumerate(images, 1):
+                try:
+                    entry = registry.get(data, digest)
+                    scale = min(doc_width / float(entry[2]), 1.0)
+                    steps.append(("image", digest, entry[2] * scale, entry[3] * scale))
+                except Exception as e:
+                    steps.append(("image_error", i, str(e)))
+    return tuple(steps)
+
+def _section_flowables(plan, files, images, theme, doc_width, registry, warnings):
+    """Fresh flowables for a compiled plan (``files`` only names failed images)."""
+    data = dict(images)
+    flows = []
+    for step in plan:
+        kind = step[0]
+        if kind == "para":
+            flows.append(step[1].make())
+        elif kind == "list":
+            flows.append(_list_flowable([p.make() for p in step[1]]))
+        elif kind == "table":
+            rows = [[c if isinstance(c, str) else c.make() for c in row] for row in step[1]]
+            flows.append(_table_flowable(rows, theme, doc_width))
+        elif kind == "image":
+            _, digest, width, height = step
+            flows.append(SharedImage(registry.get(data[digest], digest), width, height))
+            flows.append(Spacer(1, 8))
+        elif kind == "image_error" and warnings is not None:
+            _, i, error = step
+            warnings.append(f"Could not process image {getattr(files[i - 1], 'name', f'image {i}')}: {error}")
+    return flows
+
+# ---------- MAIN PDF BUILDER ----------
+
+def _layout_progress(progress, start=0.3, end=0.95):
+    """Map ReportLab's build callbacks onto ``progress(phase, fraction)``."""
+    state = {"total": 1}
+
+    def callback(kind, value):
+        if kind == "SIZE_EST":
+            state["total"] = max(value, 1)
+        elif kind == "PROGRESS":
+            progress("layout", start + (end - start) * min(value / state["total"], 1.0))
+    return callback
+
+def generate_pdf(output=None, theme="Light", warnings=None, progress=None, **kwargs):
+    """Build the portfolio PDF.
+
+    With no ``output`` the document is rendered into memory and its bytes are
+    returned; otherwise it is written to ``output`` (a path or any writable
+    binary stream), which is returned. Errors propagate to the caller;
+    skipped images are appended to ``warnings``. ``progress(phase, fraction)``
+    is called as the build advances.
+    """
+    report = progress or (lambda phase, fraction: None)
+    buffer = BytesIO() if output is None else output
+    # --- theme & styles
+    report("styles", 0.0)
+    base_font = kwargs.get("font_choice", "Helvetica")
+    with span("styles"):
+        S = _make_styles(theme, base_font=base_font)
+
+    # --- doc & frames (reserve footer space)
+    doc = BaseDocTemplate(
+        buffer,
+        pagesize=letter,
+        leftMargin=0.9 * inch,
+        rightMargin=0.9 * inch,
+        topMargin=0.9 * inch,
+        bottomMargin=0.9 * inch,
+        allowSplitting=1,
+        title=kwargs.get("project_title", "AI Consulting Portfolio"),
+        invariant=1,  # byte-identical output for identical input (render cache, ETags)
+    )
+    frame = Frame(
+        doc.leftMargin,
+        doc.bottomMargin + 0.5 * inch,  # footer space
+        doc.width,
+        doc.height - 0.7 * inch,
+        id="normal",
+        showBoundary=0,
+    )
+
+    # logos (if any), decoded once and read from memory
+    report("logo", 0.1)
+    with span("logo"):
+        try:
+            cover_logo, wm_logo = _logo_images(kwargs)
+        except:
+            cover_logo, wm_logo = None, None
+
+        wm_reader = None
+        if wm_logo:
+            try:
+                wm_reader = ImageReader(BytesIO(wm_logo))
+            except:
+                wm_reader = None
+
+    chrome = PageChrome(
+        theme,
+        logo=wm_reader,
+        logo_key=kwargs.get("logo_sha256") or ("Logo" if wm_reader else None),
+        page_numbers=kwargs.get("page_numbers", False),
+    )
+    cover_tpl = PageTemplate(
+        id="Cover",
+        frames=[frame],
+        onPage=lambda c, d: _on_cover(c, d, chrome),
+    )
+    normal_tpl = PageTemplate(
+        id="Normal",
+        frames=[frame],
+        onPage=lambda c, d: _on_page(c, d, chrome),
+    )
+    doc.addPageTemplates([cover_tpl, normal_tpl])
+
+    story = []
+    images = ImageRegistry()
+
+    # ---- COVER
+    story.append(Spacer(1, 40))
+    # cover logo (if provided)
+    if cover_logo:
+        try:
+            # center logo, capped to 1.6 in width
+            story.append(KeepTogether([
+                Image(BytesIO(cover_logo), width=1.6*inch, height=1.6*inch),
+                Spacer(1, 16)
+            ]))
+        except:
+            pass
+
+    story.append(Paragraph(kwargs.get("project_title", "AI Consulting Portfolio"), S["title"]))
+    story.append(Paragraph("Professional Consulting Portfolio", S["h2"]))
+    story.append(Spacer(1, 10))
+
+    author = kwargs.get("name", "AI Consultant")
+    story.append(Paragraph(f"Prepared by: {author}", S["body"]))
+
+    if kwargs.get("date"):
+        date_val = kwargs["date"]
+        date_str = date_val.strftime("%B %d, %Y") if hasattr(date_val, "strftime") else str(date_val)
+        story.append(Paragraph(f"Date: {date_str}", S["body"]))
+
+    story.append(Spacer(1, 22))
+    # thin accent bar
+    story.append(Table([[""]], colWidths=[doc.width], rowHeights=[6],
+                       style=_accent_bar_style(theme)))
+    story.append(Spacer(1, 8))
+    story.append(Paragraph("Elevating Expertise into Professional Impact — Powered by PyStatR+", S["small"]))
+    story.append(PageBreak())
+    # switch to normal template
+    story.append(Spacer(1, 2))
+
+    # ---- SECTIONS
+    report("sections", 0.2)
+    with span("compile"):
+        for title, key in SECTIONS:
+            content = scenario_text(kwargs) if key == "scenarios" else kwargs.get(key)
+            files = kwargs.get(f"{key}_images") or []
+            if not (content or files):
+                continue
+
+            section_images = []
+            for img_file in files:
+                data = _image_bytes(img_file)
+                section_images.append((hashlib.sha256(data).hexdigest(), data))
+            cache_key = _section_key(key, title, content, [d for d, _ in section_images],
+                                     theme, base_font, doc.width)
+            plan = SECTION_CACHE.get(cache_key)
+            if plan is None:
+                plan = _compile_section(title, key, content, section_images, S, theme, doc.width, images)
+                SECTION_CACHE.put(cache_key, plan)
+            story.extend(_section_flowables(plan, files, section_images, theme, doc.width, images, warnings))
+            story.append(Spacer(1, 10))
+
+    # ---- CLOSING
+    story.append(PageBreak())
+    story.append(Spacer(1, 40))
+    story.append(Paragraph(
+        "Thank you for reviewing this portfolio.<br/>"
+        "For inquiries, collaborations, or consulting engagements, please contact your PyStatR+ consultant.",
+        S["body"],
+    ))
+    story.append(Spacer(1, 14))
+    story.append(Paragraph("Elevating Expertise into Professional Impact — Powered by PyStatR+", S["small"]))
+
+    # ---- BUILD
+    if progress:
+        doc.setProgressCallBack(_layout_progress(progress))
+    with span("build"):
+        doc.build(story)
+    count("images", len(images))
+    report("done", 1.0)
+    return buffer.getvalue() if output is None else output
+
+_PAGE_TREE = re.compile(rb"/Count (\d+) /Kids \[[^\]]*\] /Type /Pages")
+
+def page_count(pdf):
+    """Pages in a PDF written by ``generate_pdf`` (read from its page tree)."""
+    match = _PAGE_TREE.search(pdf or b"")
+    return int(match.group(1)) if match else 0
+
+@dataclass
+class RenderResult:
+    pdf: bytes = None
+    warnings: list = field(default_factory=list)
+    error: str = None
+    pages: int = 0
+    elapsed: float = 0.0
+    telemetry: dict = None  # spans/counts gathered while rendering (when enabled)
+
+    @property
+    def ok(self):
+        return self.pdf is not None
+
+def render_portfolio(theme="Light", progress=None, **kwargs):
+    """Render into memory; failures come back in the result instead of raising."""
+    result = RenderResult()
+    started = time.perf_counter()
+    with collect() as collected:
+        try:
+            result.pdf = generate_pdf(theme=theme, warnings=result.warnings, progress=progress, **kwargs)
+            result.pages = page_count(result.pdf)
+        except Exception as e:
+            result.error = f"PDF generation failed: {e}"
+    result.telemetry = collected
+    result.elapsed = time.perf_counter() - started
+    return result
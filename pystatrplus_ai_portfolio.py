@@ -1,93 +1,127 @@
 import streamlit as st
-from reportlab.platypus import (
-    BaseDocTemplate, PageTemplate, Frame, Paragraph, Spacer, Table, TableStyle,
-    PageBreak, Image, KeepTogether, ListFlowable, ListItem, SimpleDocTemplate
-)
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.lib.utils import ImageReader
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import tempfile
-import json
-import base64
 from io import BytesIO
 import time
 import hashlib
+from contextlib import nullcontext
+from PIL import Image as PILImage
+from branding_store import (
+    BUNDLE_MODES, PRESET_DB_FILE, PRESET_PAGE_SIZE, PresetRepository,
+    export_bundle, has_logo, import_bundle, load_rendition, store_logo
+)
+from config_store import JsonConfig
+from credentials import USERS_FILE, CredentialStore, OverrideManager
+from export_jobs import get_job, portfolio_spec, submit_bulk_export, submit_export
+from portfolio_pdf import SCENARIO_HEADERS, parse_scenarios, scenario_text
+from render_cache import RENDER_CACHE_DIR, RenderCache
+from render_pool import get_render_pool
+import telemetry
 
 # Configuration Files
 CONFIG_FILE = "branding_presets.json"
 ADMIN_CONFIG_FILE = "admin_settings.json"
 
-def load_presets():
-    if os.path.exists(CONFIG_FILE):
-        with open(CONFIG_FILE, "r") as f:
-            return json.load(f)
-    return {}
+# Live preview shows section images at 300 px; only a copy that size goes to the browser
+PREVIEW_IMAGE_PX = 300
+# Longer scenario tables are previewed in a scrolling grid instead of st.table
+PREVIEW_TABLE_ROWS = 50
+SCENARIO_UPLOAD_HELP = (
+    "Columns: Option, Investment, Benefits, Risks, Recommendation (header row optional). "
+    "An uploaded table replaces the rows typed above."
+)
 
-def save_presets(presets):
-    with open(CONFIG_FILE, "w") as f:
-        json.dump(presets, f, indent=2)
+@st.cache_resource
+def get_preset_repository():
+    # shared by all sessions; the JSON library is imported into SQLite once
+    repo = PresetRepository(PRESET_DB_FILE)
+    repo.bootstrap_from_json(CONFIG_FILE)
+    return repo
+
+@st.cache_resource
+def get_render_cache():
+    return RenderCache(RENDER_CACHE_DIR)
+
+@st.cache_resource
+def warm_render_pool():
+    # renderer processes (if configured) start with the server, not on the first export
+    pool = get_render_pool()
+    if pool is not None:
+        pool.warm_up()
+    return pool
+
+@st.cache_resource
+def start_metrics_exporters():
+    # one /metrics listener or textfile writer per server process
+    return telemetry.start_exporters()
+
+@st.cache_resource
+def get_credential_store():
+    # verifiers are derived once per process; rebuilt when users.json or secrets.toml change
+    store = CredentialStore(USERS_FILE, secret_users=lambda: st.secrets["users"])
+    st.secrets.file_change_listener.connect(lambda *_: store.invalidate(), weak=False)
+    return store
+
+@st.cache_resource
+def get_admin_settings_config():
+    return JsonConfig(ADMIN_CONFIG_FILE, default={"client_pdf_theme": "Light"})
+
+@st.cache_resource
+def get_override_manager():
+    # one expiry index per process, shared by every session
+    return OverrideManager(get_admin_settings_config())
 
 def load_admin_settings():
-    if os.path.exists(ADMIN_CONFIG_FILE):
-        with open(ADMIN_CONFIG_FILE, "r") as f:
-            return json.load(f)
-    return {"client_pdf_theme": "Light"}
+    # shared read-only snapshot; edit a thaw() copy and pass it to save_admin_settings
+    return get_admin_settings_config().get()
 
 def save_admin_settings(settings):
-    with open(ADMIN_CONFIG_FILE, "w") as f:
-        json.dump(settings, f, indent=2)
-
-def simple_hash(password: str) -> str:
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def check_credentials(username: str, password: str):
-    if "password_overrides" not in st.session_state:
-        st.session_state.password_overrides = {}
-
-    admin_settings = load_admin_settings()
-    expiry_hours = admin_settings.get("override_expiry_hours", 24)
-    max_age = expiry_hours * 3600
-    now = datetime.now()
-
-    users = {
-        "alierwai": {
-            "password": simple_hash(st.secrets["users"]["alierwai_password"]),
-            "role": "admin",
-            "name": "Alier Reng"
-        },
-        "client1": {
-            "password": simple_hash(st.secrets["users"]["client1_password"]),
-            "role": "client",
-            "name": "Client One"
-        },
-        "client2": {
-            "password": simple_hash(st.secrets["users"]["client2_password"]),
-            "role": "client",
-            "name": "Client Two"
-        }
-    }
-
-    if username in st.session_state.password_overrides:
-        entry = st.session_state.password_overrides[username]
-        age = (now - entry["timestamp"]).total_seconds()
-
-        if age <= max_age:
-            users[username]["password"] = simple_hash(entry["password"])
+    return get_admin_settings_config().save(settings)
+
+def stored_upload_digest(upload):
+    """Store an uploaded logo (and its renditions) once per upload."""
+    stored = st.session_state.setdefault("stored_logo_uploads", {})
+    if upload.file_id not in stored:
+        stored[upload.file_id] = store_logo(upload.getvalue())
+    return stored[upload.file_id]
+
+def upload_digest(upload):
+    """SHA-256 of an uploaded file, computed once per upload."""
+    digests = st.session_state.setdefault("upload_digests", {})
+    if upload.file_id not in digests:
+        digests[upload.file_id] = hashlib.sha256(upload.getvalue()).hexdigest()
+    return digests[upload.file_id]
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def logo_thumbnail(digest):
+    return load_rendition(digest, "thumb")
+
+@st.cache_data(max_entries=512, show_spinner=False)
+def preview_thumbnail(digest, _upload):
+    """Downscaled copy of an uploaded section image, shared by content hash."""
+    data = _upload.getvalue()
+    try:
+        img = PILImage.open(BytesIO(data))
+        img.thumbnail((PREVIEW_IMAGE_PX, PREVIEW_IMAGE_PX), PILImage.LANCZOS)
+        out = BytesIO()
+        if img.mode in ("RGBA", "LA", "P"):
+            img.save(out, "PNG", optimize=True)
         else:
-            del st.session_state.password_overrides[username]
+            img.convert("RGB").save(out, "JPEG", quality=85)
+        return out.getvalue()
+    except Exception:
+        return data
 
-    if username in users and users[username]["password"] == simple_hash(password):
-        return users[username]
-
-    return None
+def check_credentials(username: str, password: str):
+    override = get_override_manager().get(username)
+    user = get_credential_store().verify(username, password, override=override)
+    if user is None:
+        return None
+    return {"role": user.role, "name": user.name}
 
 def check_session_timeout():
+    # also called at the top of every fragment: their reruns skip main()
     current_time = time.time()
     if "last_activity" in st.session_state:
         if current_time - st.session_state["last_activity"] > 900:
@@ -620,516 +654,665 @@ def create_metric_cards():
         </div>
         """, unsafe_allow_html=True)
 
-# ---------- THEME HELPERS ----------
+EXPORT_POLL_SECONDS = 0.5
+
+def start_export(job_key, theme, data):
+    """Queue a background render and remember its job id in the session."""
+    st.session_state[job_key] = submit_export(theme, data, cache=get_render_cache())
+
+def matching_preset_names(query):
+    """Every preset name matching ``query``, read one search page at a time."""
+    repo = get_preset_repository()
+    page = 0
+    while True:
+        matches, total = repo.search(query, page=page)
+        yield from (m["preset"] for m in matches)
+        page += 1
+        if page * PRESET_PAGE_SIZE >= total:
+            return
+
+def start_bulk_export(job_key, data, presets, themes):
+    """Queue every preset x theme combination of ``data`` into one zip."""
+    repo = get_preset_repository()
+    base = portfolio_spec(data)  # uploads read once, shared by every item
+    items = []
+    for preset in presets:
+        branding = repo.get(preset) or {}
+        spec = dict(base)
+        # brand fields come from the preset only; ones it leaves empty fall back
+        # to the renderer defaults, never to what the workshop currently shows
+        for k in ("name", "brand_color", "font_choice", "logo_sha256"):
+            spec.pop(k, None)
+            if branding.get(k):
+                spec[k] = branding[k]
+        for theme in themes:
+            items.append((f"{preset}_{theme}", theme, spec))
+    st.session_state[job_key] = submit_bulk_export(items, cache=get_render_cache())
+
+def render_export_status(job_key, file_prefix):
+    job_id = st.session_state.get(job_key)
+    job = get_job(job_id) if job_id else None
+    if job is None:
+        return
+    # poll only while the job runs; each tick reruns just this fragment
+    poll = EXPORT_POLL_SECONDS if job.active else None
+    st.fragment(run_every=poll)(_export_status)(job_key, file_prefix)
 
-def _theme_colors(theme="Light"):
-    if theme == "Dark":
-        return {
-            "text": colors.HexColor("#F8FAFC"),
-            "title": colors.HexColor("#FFD700"),
-            "heading": colors.HexColor("#38BDF8"),
-            "accent": colors.HexColor("#FFD700"),
-            "band": colors.HexColor("#0B1220"),
-            "table_bg": colors.HexColor("#111827"),
-            "table_alt": colors.HexColor("#1E293B")
-        }
-    return {
-        "text": colors.HexColor("#1A365D"),
-        "title": colors.HexColor("#1E3A8A"),
-        "heading": colors.HexColor("#38BDF8"),
-        "accent": colors.HexColor("#FFD700"),
-        "band": colors.HexColor("#EEF2FF"),
-        "table_bg": colors.whitesmoke,
-        "table_alt": colors.HexColor("#F3F4F6")
-    }
+def _export_status(job_key, file_prefix):
+    job = get_job(st.session_state[job_key])
+    if job is None:
+        return
+    polling_key = f"{job_key}_polling"
+    if job.active:
+        st.session_state[polling_key] = True
+        noun = "portfolios" if job.archive else "portfolio"
+        label = "⏳ Queued..." if job.state == "queued" else f"🔄 Building {noun}: {job.phase}"
+        st.progress(job.progress, text=label)
+        return
+    if st.session_state.pop(polling_key, False):
+        st.rerun()  # full rerun re-registers the fragment without its timer
+
+    result = job.result
+    for warning in result.warnings:
+        st.warning(warning)
+    if job.state == "failed":
+        st.error(result.error or "PDF generation failed")
+        return
 
-def _make_styles(theme="Light", base_font="Helvetica"):
-    styles = getSampleStyleSheet()
-    palette = _theme_colors(theme)
+    stamp = datetime.fromtimestamp(job.finished).strftime('%Y%m%d_%H%M%S')
+    if job.archive:
+        st.success(f"✅ {job.completed - job.failed} of {job.total} portfolios generated")
+        # read once per job; later redraws of the tab reuse the same bytes
+        data = job.archive_bytes()
+        if data is None:
+            st.error("This export has expired, please run it again")
+            return
+        label, file_name, mime = "⬇️ Download All Portfolios (ZIP)", f"{file_prefix}_{stamp}.zip", "application/zip"
+    else:
+        st.success("✅ Portfolio generated successfully")
+        data = result.pdf
+        # named by content: an unchanged portfolio keeps its download URL and ETag
+        tag = job.etag.strip('"')[:12]
+        label, file_name, mime = "⬇️ Download Your Portfolio", f"{file_prefix}_{tag}.pdf", "application/pdf"
+    # delivery is timed once per job, not on every rerun that redraws the button
+    first_view = not job.delivered
+    job.delivered = True
+    with telemetry.span("deliver") if first_view else nullcontext():
+        st.download_button(
+            label,
+            data,
+            file_name=file_name,
+            mime=mime,
+            use_container_width=True,
+            key=f"download_{job.id}",
+        )
 
-    # Base body
-    body = ParagraphStyle(
-        "Body",
-        parent=styles["Normal"],
-        fontName=base_font,
-        fontSize=11.5,
-        leading=16,
-        textColor=palette["text"],
-        spaceBefore=6,
-        spaceAfter=6,
-        alignment=TA_JUSTIFY,
-    )
-    # Title
-    title = ParagraphStyle(
-        "TitleX",
-        parent=styles["Title"],
-        fontName="Helvetica-Bold",
-        fontSize=28,
-        leading=32,
-        textColor=palette["title"],
-        alignment=TA_CENTER,
-        spaceAfter=18,
-    )
-    # Subtitle/Header line
-    h2 = ParagraphStyle(
-        "H2",
-        parent=styles["Heading2"],
-        fontName="Helvetica-Bold",
-        fontSize=16,
-        leading=20,
-        textColor=palette["heading"],
-        spaceBefore=18,
-        spaceAfter=8,
-    )
-    # Small footer text
-    small = ParagraphStyle(
-        "Small",
-        parent=styles["Normal"],
-        fontName=base_font,
-        fontSize=9.5,
-        leading=12,
-        textColor=palette["heading"],
-        alignment=TA_CENTER,
-    )
-    # Bullet items
-    bullet = ParagraphStyle(
-        "Bullet",
-        parent=body,
-        leftIndent=0,
-        spaceBefore=2,
-        spaceAfter=2,
+@st.fragment
+def render_client_theme_setting():
+    check_session_timeout()
+    admin_settings = load_admin_settings()
+    client_pdf_theme = st.radio(
+        "🎨 Default PDF Theme for All Clients",
+        ["Light", "Dark"],
+        index=0 if admin_settings["client_pdf_theme"] == "Light" else 1
     )
-    return {"body": body, "title": title, "h2": h2, "small": small, "bullet": bullet, "palette": palette}
-
-# ---------- PAGE DECORATIONS ----------
-
-def _draw_heart(canvas_obj, x, y, s=8, color=colors.HexColor("#EF4444")):
-    # Simple vector heart: two circles + triangle
-    canvas_obj.saveState()
-    canvas_obj.setFillColor(color)
-    r = s * 0.35
-    # left bump
-    canvas_obj.circle(x - r, y, r, fill=1, stroke=0)
-    # right bump
-    canvas_obj.circle(x + r, y, r, fill=1, stroke=0)
-    # point
-    p = canvas_obj.beginPath()
-    p.moveTo(x - 2*r, y)
-    p.lineTo(x + 2*r, y)
-    p.lineTo(x, y - 2.2*r)
-    p.close()
-    canvas_obj.drawPath(p, fill=1, stroke=0)
-    canvas_obj.restoreState()
-
-def add_watermark(canvas_obj, doc, theme="Light", logo_path=None):
-    canvas_obj.saveState()
     
-    if theme == "Dark":
-        wm_color = colors.Color(1, 1, 1, alpha=0.08)
-    else:
-        wm_color = colors.Color(0.1, 0.2, 0.5, alpha=0.08)
-    
-    if logo_path and os.path.exists(logo_path):
-        logo = ImageReader(logo_path)
-        canvas_obj.translate(150, 250)
-        canvas_obj.rotate(30)
-        canvas_obj.drawImage(logo, 0, 0, width=300, height=300, mask='auto')
-    else:
-        canvas_obj.setFont("Helvetica-Bold", 60)
-        canvas_obj.setFillColor(wm_color)
-        canvas_obj.translate(300, 400)
-        canvas_obj.rotate(45)
-        canvas_obj.drawCentredString(0, 0, "PyStatRPlus")
-    
-    canvas_obj.restoreState()
-
-def _footer(canvas_obj, doc, theme="Light"):
-    palette = _theme_colors(theme)
-    canvas_obj.saveState()
-    w = doc.width
-    x = doc.leftMargin
-    y = 0.55 * inch
-
-    # subtle divider
-    canvas_obj.setStrokeColor(palette["accent"])
-    canvas_obj.setLineWidth(0.8)
-    canvas_obj.line(x, y + 12, x + w, y + 12)
-
-    # "Built with ♥ by PyStatR+!" (italicized in deep blue)
-    text = "Built with  by PyStatR+!"
-    canvas_obj.setFillColor(colors.HexColor("#1E3A8A"))  # Deep blue color
-    canvas_obj.setFont("Helvetica-Oblique", 9.5)  # Italic font
-    tw = canvas_obj.stringWidth(text, "Helvetica-Oblique", 9.5)
-    cx = doc.leftMargin + (doc.width / 2.0) - (tw / 2.0)
-    canvas_obj.drawString(cx, y, text)
-    # draw the heart over the gap after "with "
-    heart_x = cx + canvas_obj.stringWidth("Built with ", "Helvetica-Oblique", 9.5) + 5
-    heart_y = y + 4
-    _draw_heart(canvas_obj, heart_x, heart_y, s=9, color=colors.HexColor("#EF4444"))
+    if client_pdf_theme != admin_settings["client_pdf_theme"]:
+        save_admin_settings({**admin_settings, "client_pdf_theme": client_pdf_theme})
+        st.success(f"Client theme updated to **{client_pdf_theme}**")
 
-    canvas_obj.restoreState()
-
-def _on_page(canvas_obj, doc, theme="Light", wm_logo_path=None):
-    # optional watermark first
-    add_watermark(canvas_obj, doc, theme=theme, logo_path=wm_logo_path)
-    _footer(canvas_obj, doc, theme)
+@st.fragment
+def render_telemetry_panel():
+    check_session_timeout()
+    if not telemetry.ENABLED:
+        return
+    registry = telemetry.REGISTRY
+    with st.expander("📈 Export Telemetry"):
+        ok = registry.counter("exports_total", status="ok")
+        failed = registry.counter("exports_total", status="failed")
+        st.markdown(
+            f"**Exports:** {ok} ok, {failed} failed, {registry.counter('cache_hits_total')} cached  \n"
+            f"**Pages:** {registry.counter('pages_total')} · "
+            f"**Images:** {registry.counter('images_total')} · "
+            f"**Output:** {registry.counter('pdf_bytes_total') / 1e6:.1f} MB"
+        )
+        rows = registry.phase_summary()
+        if rows:
+            st.table([
+                {"Phase": phase, "Count": n, "Mean ms": f"{mean * 1000:.1f}",
+                 "p50 ≤ ms": f"{p50 * 1000:g}", "p95 ≤ ms": f"{p95 * 1000:g}"}
+                for phase, n, mean, p50, p95 in rows
+            ])
+        else:
+            st.caption("No exports yet in this server process.")
 
-def _on_cover(canvas_obj, doc, theme="Light", wm_logo_path=None):
-    # cover can share same footer/watermark
-    add_watermark(canvas_obj, doc, theme=theme, logo_path=wm_logo_path)
-    _footer(canvas_obj, doc, theme)
+@st.fragment
+def render_password_panel():
+    # sidebar fragment: call inside `with st.sidebar`
+    check_session_timeout()
+    overrides = get_override_manager()
+    st.markdown("### 🔑 Password Management")
 
-# ---------- CONTENT HELPERS ----------
+    # everything changed in this run (expiries included) is saved once
+    with overrides.batch():
+        expired = overrides.expire()
+        users = get_credential_store().usernames(role="client")
 
-def _bulleted_list(text, style):
-    if not text:
-        return None
-    lines = [ln.strip("• ").strip("- ").strip() for ln in text.split("\n") if ln.strip()]
-    if not lines:
-        return None
-    items = [ListItem(Paragraph(line, style), leftIndent=6) for line in lines]
-    return ListFlowable(
-        items,
-        bulletType="bullet",
-        start="circle",
-        bulletFontName="Helvetica",
-        bulletFontSize=10,
-        bulletIndent=0,
-        leftIndent=12,
-        spaceBefore=4,
-        spaceAfter=6,
-    )
-def _scenario_table(raw, theme="Light", doc_width=450):
-    if not raw:
-        return None
-    rows = []
-    for ln in raw.split("\n"):
-        if "|" in ln:
-            parts = [p.strip() for p in ln.split("|")]
-            if len(parts) >= 5:
-                rows.append(parts[:5])
+        reset_user = st.selectbox("Select user", users)
+        new_pass = st.text_input("New password", type="password")
 
-    if not rows:
-        return None
-
-    palette = _theme_colors(theme)
-    headers = ["Option", "Investment", "Benefits", "Risks", "Recommendation"]
-    
-    # Wrap text in Paragraphs for proper text wrapping
-    style = ParagraphStyle(
-        "TableCell",
-        fontName="Helvetica",
-        fontSize=9,
-        leading=11,
-        alignment=TA_LEFT,
-        textColor=palette["text"]
-    )
+        if st.button("🔄 Update Password"):
+            if not new_pass:
+                st.error("Enter a new password")
+            else:
+                overrides.set(reset_user, new_pass)
+                st.success(f"Password for {reset_user} updated")
+
+        if st.button("🔓 Reset to Default Passwords"):
+            overrides.clear()
+            st.info("All overrides cleared")
+
+        st.markdown("#### ⏰ Override Expiry")
+        expiry_hours = st.slider("Expiry Time (hours)", 1, 72, overrides.expiry_hours, 1)
+
+        if expiry_hours != overrides.expiry_hours:
+            overrides.set_expiry_hours(expiry_hours)
+            expired += overrides.expire()  # a shorter expiry may end some now
+            st.success(f"Override expiry updated to {expiry_hours} hours")
+
+        active = overrides.active()
+
+    if active:
+        st.markdown("#### 📋 Active Overrides")
+        for user, set_at, remaining in active:
+            hrs = int(remaining // 3600)
+            mins = int((remaining % 3600) // 60)
+            st.write(f"**{user}** — expires in {hrs}h {mins}m (set {set_at.strftime('%Y-%m-%d %H:%M')})")
+    for user in expired:
+        st.warning(f"Override for {user} expired and was reset")
+
+@st.fragment
+def render_brand_workshop():
+    # reruns on its own while branding is edited; commits only the brand fields
+    check_session_timeout()
+    preset_repo = get_preset_repository()
+    st.markdown('<div class="client-container">', unsafe_allow_html=True)
+    st.markdown("## 🎨 Branding Studio")
     
-    header_style = ParagraphStyle(
-        "TableHeader",
-        fontName="Helvetica-Bold",
-        fontSize=9,
-        leading=11,
-        alignment=TA_CENTER,
-        textColor=colors.HexColor("#1E3A8A")
-    )
+    col1, col2 = st.columns([2, 1])
     
-    # Create header row with Paragraphs
-    data = [[Paragraph(h, header_style) for h in headers]]
+    with col1:
+        # only one page of metadata is queried; logos are never listed
+        preset_query = st.text_input(
+            "🔎 Search Presets",
+            placeholder="Type a name, prefix, or initials"
+        )
+        page = st.session_state.get("preset_page", 1)
+        matches, total_presets = preset_repo.search(
+            preset_query, page=page - 1, page_size=PRESET_PAGE_SIZE
+        )
+        page_count = max(1, -(-total_presets // PRESET_PAGE_SIZE))
+        if page > page_count:
+            # a narrower search can leave us past the last page
+            st.session_state.preset_page = page_count
+            matches, _ = preset_repo.search(
+                preset_query, page=page_count - 1, page_size=PRESET_PAGE_SIZE
+            )
+        selected_preset = st.selectbox(
+            "📚 Brand Preset Library",
+            ["Create New"] + [m["preset"] for m in matches]
+        )
     
-    # Create data rows with Paragraphs for wrapping
-    for row in rows:
-        data.append([Paragraph(str(cell), style) for cell in row])
-
-    # Proportional widths
-    col_widths = [
-        doc_width * 0.18,
-        doc_width * 0.16,
-        doc_width * 0.26,
-        doc_width * 0.26,
-        doc_width * 0.14,
-    ]
-
-    t = Table(data, colWidths=col_widths, repeatRows=1)
-    t.setStyle(TableStyle([
-        # header - Gold gradient background with deep blue text
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#FFD700")),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, 0), 9),
-        ("ALIGN", (0, 0), (-1, 0), "CENTER"),
-        ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),
-        ("TOPPADDING", (0, 0), (-1, 0), 8),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-        # body
-        ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
-        ("FONTSIZE", (0, 1), (-1, -1), 9),
-        ("ALIGN", (0, 1), (-1, -1), "LEFT"),
-        ("VALIGN", (0, 1), (-1, -1), "TOP"),
-        ("TOPPADDING", (0, 1), (-1, -1), 6),
-        ("BOTTOMPADDING", (0, 1), (-1, -1), 6),
-        ("LEFTPADDING", (0, 0), (-1, -1), 4),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 4),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [palette["table_bg"], palette["table_alt"]]),
-        ("GRID", (0, 0), (-1, -1), 0.6, colors.HexColor("#FFD700")),  # Gold borders
-    ]))
-    return t
-
-def _image_flowables(files, max_width):
-    """Scale images to fit page width, keep aspect ratio."""
-    if not files:
-        return [], []
-    temps = []
-    flows = []
-    for img_file in files:
-        try:
-            img_file.seek(0)
-            suffix = os.path.splitext(getattr(img_file, "name", "img"))[1] or ".png"
-            with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-                tmp.write(img_file.read())
-                path = tmp.name
-                temps.append(path)
-            reader = ImageReader(path)
-            iw, ih = reader.getSize()
-            scale = min(max_width / float(iw), 1.0)
-            w = iw * scale
-            h = ih * scale
-            flows.append(Image(path, width=w, height=h))
-            flows.append(Spacer(1, 8))
-        except Exception as e:
-            st.warning(f"Could not process image {getattr(img_file, 'name', 'image')}: {e}")
-    return flows, temps
-
-# ---------- MAIN PDF BUILDER ----------
-
-def generate_pdf(filename, theme="Light", **kwargs):
-    temp_files = []
-    try:
-        # --- theme & styles
-        palette = _theme_colors(theme)
-        base_font = kwargs.get("font_choice", "Helvetica")
-        S = _make_styles(theme, base_font=base_font)
-
-        # --- doc & frames (reserve footer space)
-        doc = BaseDocTemplate(
-            filename,
-            pagesize=letter,
-            leftMargin=0.9 * inch,
-            rightMargin=0.9 * inch,
-            topMargin=0.9 * inch,
-            bottomMargin=0.9 * inch,
-            allowSplitting=1,
-            title=kwargs.get("project_title", "AI Consulting Portfolio"),
+    with col2:
+        st.number_input(
+            f"📄 Page (of {page_count})",
+            min_value=1,
+            max_value=page_count,
+            key="preset_page"
         )
-        frame = Frame(
-            doc.leftMargin,
-            doc.bottomMargin + 0.5 * inch,  # footer space
-            doc.width,
-            doc.height - 0.7 * inch,
-            id="normal",
-            showBoundary=0,
+        st.caption(f"{total_presets} preset(s) found")
+        
+        selected_branding = None
+        if selected_preset != "Create New":
+            selected_branding = preset_repo.get(selected_preset)
+        if selected_branding:
+            st.success(f"✅ Active: {selected_preset}")
+            branding = selected_branding
+        else:
+            branding = {
+                "name": "AI Consultant Pro",
+                "brand_color": "#1E3A8A",
+                "font_choice": "Helvetica",
+                "logo_sha256": None,
+                "pdf_theme": "Light"
+            }
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        name_input = st.text_input(
+            "👤 Professional Identity",
+            value=branding.get("name", "")
         )
-
-        # watermark logo (if any)
-        wm_logo_path = None
-        if kwargs.get("logo"):
-            try:
-                logo_bytes = base64.b64decode(kwargs["logo"])
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                    tmp.write(logo_bytes)
-                    wm_logo_path = tmp.name
-                    temp_files.append(wm_logo_path)
-            except:
-                wm_logo_path = None
-
-        cover_tpl = PageTemplate(
-            id="Cover",
-            frames=[frame],
-            onPage=lambda c, d: _on_cover(c, d, theme, wm_logo_path),
+        
+        brand_color = st.color_picker(
+            "🎨 Signature Brand Color",
+            value=branding.get("brand_color", "#1E3A8A")
         )
-        normal_tpl = PageTemplate(
-            id="Normal",
-            frames=[frame],
-            onPage=lambda c, d: _on_page(c, d, theme, wm_logo_path),
+    
+    with col2:
+        font_choice = st.selectbox(
+            "📝 Typography",
+            ["Helvetica", "Times-Roman", "Courier"],
+            index=["Helvetica", "Times-Roman", "Courier"].index(
+                branding.get("font_choice", "Helvetica")
+            )
         )
-        doc.addPageTemplates([cover_tpl, normal_tpl])
-
-        story = []
-
-        # ---- COVER
-        story.append(Spacer(1, 40))
-        # cover logo (if provided)
-        if kwargs.get("logo"):
-            try:
-                logo_bytes = base64.b64decode(kwargs["logo"])
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp:
-                    tmp.write(logo_bytes)
-                    logo_path = tmp.name
-                    temp_files.append(logo_path)
-                # center logo, capped to 1.6 in width
-                story.append(KeepTogether([
-                    Image(logo_path, width=1.6*inch, height=1.6*inch),
-                    Spacer(1, 16)
-                ]))
-            except:
-                pass
-
-        story.append(Paragraph(kwargs.get("project_title", "AI Consulting Portfolio"), S["title"]))
-        story.append(Paragraph("Professional Consulting Portfolio", S["h2"]))
-        story.append(Spacer(1, 10))
-
-        author = kwargs.get("name", "AI Consultant")
-        story.append(Paragraph(f"Prepared by: {author}", S["body"]))
-
-        if kwargs.get("date"):
-            date_val = kwargs["date"]
-            date_str = date_val.strftime("%B %d, %Y") if hasattr(date_val, "strftime") else str(date_val)
-            story.append(Paragraph(f"Date: {date_str}", S["body"]))
-
-        story.append(Spacer(1, 22))
-        # thin accent bar
-        story.append(Table([[""]], colWidths=[doc.width], rowHeights=[6],
-                           style=TableStyle([("BACKGROUND", (0,0), (-1,-1), palette["heading"])])))
-        story.append(Spacer(1, 8))
-        story.append(Paragraph("Elevating Expertise into Professional Impact — Powered by PyStatR+", S["small"]))
-        story.append(PageBreak())
-        # switch to normal template
-        story.append(Spacer(1, 2))
-
-        # ---- SECTIONS
-        sections = [
-            ("Executive Summary", "exec_summary"),
-            ("Strategic Opportunities", "opportunities"),
-            ("Risk Assessment", "risks"),
-            ("Scenario Analysis", "scenarios"),
-            ("Professional Insights", "reflection"),
-            ("Design Case Study", "logo_text"),
-        ]
-
-        for title, key in sections:
-            content = kwargs.get(key)
-            imgs = kwargs.get(f"{key}_images")
-            if not (content or imgs):
-                continue
-
-            story.append(Paragraph(title, S["h2"]))
+        
+        pdf_theme = st.radio(
+            "🌓 Document Theme",
+            ["Light", "Dark"],
+            index=0 if branding.get("pdf_theme", "Light") == "Light" else 1,
+            horizontal=True
+        )
+    
+    st.markdown("### 🖼️ Professional Logo")
+    logo_digest = None
+    logo_size = 0
+    logo_upload = st.file_uploader(
+        "📤 Upload Your Brand Mark",
+        type=["png", "jpg", "jpeg"]
+    )
+    
+    if logo_upload:
+        # stored with its renditions at upload time
+        logo_digest = stored_upload_digest(logo_upload)
+        logo_size = logo_upload.size
+    elif branding.get("logo_sha256"):
+        logo_digest = branding["logo_sha256"]
+        logo_size = branding.get("logo_size", 0)
+    
+    thumbnail = logo_thumbnail(logo_digest) if has_logo(logo_digest) else None
+    if thumbnail:
+        st.image(thumbnail, width=200)
+    elif logo_digest:
+        # preset points at a blob this host does not have (e.g. a metadata-only import)
+        st.caption("⚠️ Logo missing — upload it again to restore it")
+        logo_digest, logo_size = None, 0
+    
+    st.markdown("### 💼 Brand Preset Manager")
+    preset_name_input = st.text_input(
+        "🏷️ Preset Collection Name",
+        value=selected_preset if selected_preset != "Create New" else ""
+    )
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        if st.button("💾 Save Branding Profile", use_container_width=True):
+            if preset_name_input.strip():
+                preset_repo.upsert(preset_name_input, {
+                    "name": name_input,
+                    "brand_color": brand_color,
+                    "font_choice": font_choice,
+                    "pdf_theme": pdf_theme,
+                    "logo_sha256": logo_digest,
+                    "logo_size": logo_size
+                })
+                st.success(f"Brand preset '{preset_name_input}' saved")
+                st.rerun()  # the Export Hub lists presets too
+            else:
+                st.error("Please enter a preset name")
+    
+    with col2:
+        if st.button("🗑️ Delete Branding Profile", use_container_width=True):
+            if selected_branding:
+                preset_repo.delete(selected_preset)
+                st.success(f"Preset '{selected_preset}' removed")
+                st.rerun()
+    
+    with col3:
+        if st.button("🔄 Reload Preset Library", use_container_width=True):
+            st.rerun()
+    
+    with st.expander("📦 Transfer Preset Library"):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("**Export bundle**")
+            if st.button("📦 Prepare Library Bundle", use_container_width=True):
+                # built on a disk-backed spool; only the finished archive is handed to Streamlit
+                with tempfile.SpooledTemporaryFile(max_size=8 << 20) as bundle:
+                    stats = export_bundle(preset_repo, bundle)
+                    bundle.seek(0)
+                    bundle_bytes = bundle.read()
+                st.caption(f"{stats['presets']} preset(s), {stats['logos']} logo(s)")
+                st.download_button(
+                    "⬇️ Download Bundle",
+                    bundle_bytes,
+                    file_name=f"brand_presets_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                    mime="application/zip",
+                    use_container_width=True
+                )
+        
+        with col2:
+            st.markdown("**Import bundle**")
+            bundle_upload = st.file_uploader("📥 Preset Bundle", type=["zip"])
+            import_mode = st.radio(
+                "On name conflicts",
+                BUNDLE_MODES,
+                format_func={
+                    "merge": "Overwrite with bundle",
+                    "keep": "Keep existing",
+                    "replace": "Replace whole library",
+                }.get,
+                horizontal=True
+            )
+            if bundle_upload and st.button("📥 Import Bundle", use_container_width=True):
+                try:
+                    stats = import_bundle(preset_repo, bundle_upload, mode=import_mode)
+                    st.success(
+                        f"Imported {stats['presets']} preset(s), "
+                        f"{stats['logos']} new logo(s) "
+                        f"({stats['logos_skipped']} already stored)"
+                    )
+                except Exception as e:
+                    st.error(f"Bundle import failed: {e}")
+    
+    st.session_state.portfolio_data.update({
+        "name": name_input,
+        "brand_color": brand_color,
+        "font_choice": font_choice,
+        "logo_sha256": logo_digest,
+        "pdf_theme": pdf_theme
+    })
+    
+    st.markdown('</div>', unsafe_allow_html=True)
 
-            if key in ("opportunities", "risks"):
-                bl = _bulleted_list(content, S["bullet"])
-                if bl:
-                    story.append(bl)
+@st.fragment
+def render_content_composer():
+    check_session_timeout()
+    st.markdown('<div class="client-container">', unsafe_allow_html=True)
+    st.markdown("## ✍️ Content Builder")
+    
+    st.markdown("### 📋 Project Overview")
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        project_title = st.text_input(
+            "📌 Portfolio Title",
+            value="Generative AI Consulting Training Program"
+        )
+    
+    with col2:
+        date = st.date_input("📅 Project Date", datetime.today())
+    
+    sections = [
+        ("📊 Executive Summary", "exec_summary"),
+        ("🚀 Strategic Opportunities", "opportunities"),
+        ("⚠️ Risk Assessment", "risks"),
+        ("🎯 Scenario Analysis", "scenarios"),
+        ("💡 Professional Insights", "reflection"),
+        ("🎨 Design Case Study", "logo_text")
+    ]
+    
+    content_data = {}
+    
+    for title, key in sections:
+        st.markdown(f"### {title}")
+        
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            if key in ["opportunities", "risks"]:
+                content_data[key] = st.text_area(
+                    f"{title} Content",
+                    height=120,
+                    label_visibility="collapsed"
+                )
             elif key == "scenarios":
-                tbl = _scenario_table(content, theme=theme, doc_width=doc.width)
-                if tbl:
-                    story.append(tbl)
+                content_data[key] = st.text_area(
+                    f"{title} Content",
+                    value="Strategic Option A | High Investment | 40% Efficiency Gains | Implementation Risk | Highly Recommended\nStrategic Option B | Medium Investment | 25% Cost Savings | Lower Risk Profile | Worth Considering",
+                    height=120,
+                    label_visibility="collapsed"
+                )
+                content_data["scenarios_file"] = st.file_uploader(
+                    "📄 Or upload a CSV/TSV scenario table",
+                    type=["csv", "tsv", "txt"],
+                    key="scenarios_file",
+                    help=SCENARIO_UPLOAD_HELP
+                )
             else:
-                if content:
-                    story.append(Paragraph(content.replace("\n\n", "<br/><br/>").replace("\n", "<br/>"), S["body"]))
-
-            if imgs:
-                flows, temps = _image_flowables(imgs, max_width=doc.width)
-                temp_files.extend(temps)
-                if flows:
-                    story.extend(flows)
-
-            story.append(Spacer(1, 10))
-
-        # ---- CLOSING
-        story.append(PageBreak())
-        story.append(Spacer(1, 40))
-        story.append(Paragraph(
-            "Thank you for reviewing this portfolio.<br/>"
-            "For inquiries, collaborations, or consulting engagements, please contact your PyStatR+ consultant.",
-            S["body"],
-        ))
-        story.append(Spacer(1, 14))
-        story.append(Paragraph("Elevating Expertise into Professional Impact — Powered by PyStatR+", S["small"]))
-
-        # ---- BUILD
-        doc.build(story)
-        return True
-
-    except Exception as e:
-        st.error(f"PDF generation failed: {e}")
-        return False
-    finally:
-        for temp in temp_files:
-            try:
-                if os.path.exists(temp):
-                    os.unlink(temp)
-            except:
-                pass
-
-def render_password_panel(admin_settings):
-    st.sidebar.markdown("### 🔑 Password Management")
-
-    if "password_overrides" not in st.session_state:
-        st.session_state.password_overrides = {}
-
-    if "password_overrides" in admin_settings:
-        for user, info in admin_settings["password_overrides"].items():
-            try:
-                ts = datetime.fromisoformat(info["timestamp"])
-                st.session_state.password_overrides[user] = {
-                    "password": info["password"],
-                    "timestamp": ts
-                }
-            except:
-                continue
-
-    users = list(st.secrets["users"].keys())
-    users = [u for u in users if u.lower() != "alierwai"]
-
-    reset_user = st.sidebar.selectbox("Select user", users)
-    new_pass = st.sidebar.text_input("New password", type="password")
-
-    if st.sidebar.button("🔄 Update Password"):
-        st.session_state.password_overrides[reset_user] = {
-            "password": new_pass,
-            "timestamp": datetime.now()
-        }
-        admin_settings["password_overrides"] = {
-            k: {"password": v["password"], "timestamp": v["timestamp"].isoformat()}
-            for k, v in st.session_state.password_overrides.items()
-        }
-        save_admin_settings(admin_settings)
-        st.sidebar.success(f"Password for {reset_user} updated")
-
-    if st.sidebar.button("🔓 Reset to Default Passwords"):
-        st.session_state.password_overrides.clear()
-        admin_settings.pop("password_overrides", None)
-        save_admin_settings(admin_settings)
-        st.sidebar.info("All overrides cleared")
-
-    expiry_hours = admin_settings.get("override_expiry_hours", 24)
-    st.sidebar.markdown("#### ⏰ Override Expiry")
-    expiry_hours = st.sidebar.slider("Expiry Time (hours)", 1, 72, expiry_hours, 1)
+                content_data[key] = st.text_area(
+                    f"{title} Content",
+                    height=150,
+                    label_visibility="collapsed"
+                )
+        
+        with col2:
+            content_data[f"{key}_images"] = st.file_uploader(
+                f"🖼️ Images for {title.split(' ', 1)[1]}",
+                type=["png", "jpg", "jpeg"],
+                accept_multiple_files=True,
+                key=f"{key}_images",
+                label_visibility="collapsed"
+            )
+            
+            if content_data[f"{key}_images"]:
+                st.success(f"✅ {len(content_data[f'{key}_images'])} image(s)")
+    
+    st.session_state.portfolio_data.update(content_data)
+    st.session_state.portfolio_data.update({
+        "project_title": project_title,
+        "date": date
+    })
+    
+    st.markdown('</div>', unsafe_allow_html=True)
 
-    if expiry_hours != admin_settings.get("override_expiry_hours", 24):
-        admin_settings["override_expiry_hours"] = expiry_hours
-        save_admin_settings(admin_settings)
-        st.sidebar.success(f"Override expiry updated to {expiry_hours} hours")
+@st.fragment
+def render_portfolio_preview():
+    check_session_timeout()
+    st.markdown('<div class="client-container">', unsafe_allow_html=True)
+    st.markdown("## 👀 Live Preview")
+    # tabs all run on every pass, so the preview body is opt-in
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        live = st.toggle("Show live preview", key="live_preview")
+    with col2:
+        # edits in the other tabs rerun only their own fragment
+        st.button("🔄 Refresh Preview", key="refresh_preview", disabled=not live)
+    
+    if not live:
+        st.info("Preview is paused. Turn it on to see the portfolio as it stands.")
+        st.markdown('</div>', unsafe_allow_html=True)
+        return
+    
+    data = st.session_state.portfolio_data
+    
+    if data.get("logo_sha256"):
+        try:
+            st.image(logo_thumbnail(data["logo_sha256"]), width=150)
+        except:
+            pass
+    
+    st.title(data.get("project_title", "Project Title"))
+    st.write(f"**Prepared by:** {data.get('name', 'Your Name')}")
+    
+    if data.get("date"):
+        st.write(f"**Date:** {data['date'].strftime('%B %d, %Y')}")
+    
+    st.markdown("---")
+    
+    sections = [
+        ("Executive Summary", "exec_summary"),
+        ("Strategic Opportunities", "opportunities"),
+        ("Risk Assessment", "risks"),
+        ("Scenario Analysis", "scenarios"),
+        ("Professional Insights", "reflection"),
+        ("Design Case Study", "logo_text")
+    ]
+    
+    for title, key in sections:
+        if data.get(key) or (key == "scenarios" and data.get("scenarios_file")):
+            st.subheader(title)
+            
+            if key in ["opportunities", "risks"]:
+                items = [line.strip() for line in data[key].split("\n") if line.strip()]
+                for item in items:
+                    st.write(f"• {item}")
+            elif key == "scenarios":
+                rows = parse_scenarios(scenario_text(data))
+                if len(rows) > PREVIEW_TABLE_ROWS:
+                    st.caption(f"{len(rows):,} scenarios")
+                    st.dataframe([dict(zip(SCENARIO_HEADERS, row)) for row in rows], hide_index=True)
+                elif rows:
+                    st.table([list(SCENARIO_HEADERS)] + rows)
+            else:
+                st.write(data[key])
+            
+            if data.get(f"{key}_images"):
+                st.image(
+                    [preview_thumbnail(upload_digest(img), img) for img in data[f"{key}_images"]],
+                    width=PREVIEW_IMAGE_PX
+                )
+    
+    st.markdown('</div>', unsafe_allow_html=True)
 
-    MAX_AGE = expiry_hours * 3600
+@st.fragment
+def render_export_hub():
+    check_session_timeout()
+    preset_repo = get_preset_repository()
+    st.markdown('<div class="client-container">', unsafe_allow_html=True)
+    st.markdown("## 📑 PDF Export Studio")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        export_theme = st.radio(
+            "🌓 Export Theme",
+            ["Light", "Dark"],
+            horizontal=True
+        )
+    
+    with col2:
+        st.info("**💡 Pro Tips:**\n\n• Use high-res images\n• Keep content concise\n• Preview before export")
+    
+    if st.button("📊 Generate Professional Portfolio", use_container_width=True):
+        start_export("admin_export_job", export_theme, st.session_state.portfolio_data)
+    render_export_status("admin_export_job", "Admin_Portfolio")
+    
+    st.markdown("### 📦 Bulk Export")
+    st.caption("Render the current content once per branding preset and theme, collected in one ZIP.")
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        # one search page of options; picks from earlier searches stay selected
+        bulk_query = st.text_input("🔎 Filter Presets", placeholder="Type a name, prefix, or initials")
+        matches, bulk_matching = preset_repo.search(bulk_query)
+        picked = st.session_state.get("bulk_presets", [])
+        options = picked + [m["preset"] for m in matches if m["preset"] not in picked]
+        bulk_all = st.checkbox(f"All {bulk_matching} matching preset(s)", key="bulk_all")
+        bulk_presets = st.multiselect("🎨 Branding Presets", options, key="bulk_presets",
+                                      disabled=bulk_all)
+    with col2:
+        bulk_themes = st.multiselect("🌓 Themes", ["Light", "Dark"], default=["Light", "Dark"])
+    bulk_count = bulk_matching if bulk_all else len(bulk_presets)
+    bulk_total = bulk_count * len(bulk_themes)
+    if st.button(f"📦 Export {bulk_total} Portfolio(s) as ZIP", use_container_width=True,
+                 disabled=not bulk_total):
+        if bulk_all:
+            bulk_presets = list(matching_preset_names(bulk_query))
+        start_bulk_export("admin_bulk_job", st.session_state.portfolio_data, bulk_presets, bulk_themes)
+    render_export_status("admin_bulk_job", "Portfolios")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+
+@st.fragment
+def render_client_composer():
+    check_session_timeout()
+    st.markdown('<div class="client-container">', unsafe_allow_html=True)
+    st.markdown("### 📋 Project Information")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        project_title = st.text_input("📌 Project Title", "Consulting Engagement")
+    with col2:
+        date = st.date_input("📅 Date")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="client-container">', unsafe_allow_html=True)
+    st.markdown("### 📝 Portfolio Content")
+    
+    exec_summary = st.text_area("📊 Executive Summary", height=150)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        opportunities = st.text_area("🚀 Strategic Opportunities", height=120)
+    with col2:
+        risks = st.text_area("⚠️ Risk Assessment", height=120)
+    
+    scenarios = st.text_area("🎯 Scenario Analysis", 
+                            value="Primary Strategy | High Investment | 35% ROI | Moderate Risk | Recommended\nAlternative Approach | Medium Investment | 20% ROI | Lower Risk | Consider",
+                            height=100)
+    scenarios_file = st.file_uploader("📄 Or upload a CSV/TSV scenario table", type=["csv", "tsv", "txt"],
+                                      help=SCENARIO_UPLOAD_HELP)
+    
+    reflection = st.text_area("💡 Professional Insights", height=150)
+    logo_text = st.text_area("🎨 Design Case Study", height=150)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.markdown('<div class="client-container">', unsafe_allow_html=True)
+    st.markdown("### 🖼️ Visual Assets (Optional)")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        exec_images = st.file_uploader("📊 Executive Summary Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
+        or_images = st.file_uploader("🚀 Opportunities & Risks Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
+        scen_images = st.file_uploader("🎯 Scenario Analysis Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
+    
+    with col2:
+        reflection_images = st.file_uploader("💡 Professional Insights Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
+        logo_images = st.file_uploader("🎨 Design Case Study Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
+    
+    st.markdown('</div>', unsafe_allow_html=True)
+    
+    st.session_state.client_data = {
+        "project_title": project_title,
+        "date": date,
+        "name": f"Client Portfolio - {st.session_state.user_name}",
+        "brand_color": "#1E3A8A",
+        "font_choice": "Helvetica",
+        "exec_summary": exec_summary,
+        "opportunities": opportunities,
+        "risks": risks,
+        "scenarios": scenarios,
+        "scenarios_file": scenarios_file,
+        "reflection": reflection,
+        "logo_text": logo_text,
+        "exec_summary_images": exec_images,
+        "opportunities_images": or_images,
+        "risks_images": or_images,
+        "scenarios_images": scen_images,
+        "reflection_images": reflection_images,
+        "logo_text_images": logo_images
+    }
 
-    if st.session_state.password_overrides:
-        st.sidebar.markdown("#### 📋 Active Overrides")
-        now = datetime.now()
-        for user, info in list(st.session_state.password_overrides.items()):
-            age = (now - info["timestamp"]).total_seconds()
-            remaining = MAX_AGE - age
-            if remaining > 0:
-                hrs = int(remaining // 3600)
-                mins = int((remaining % 3600) // 60)
-                st.sidebar.write(
-                    f"**{user}** — expires in {hrs}h {mins}m "
-                    f"(set {info['timestamp'].strftime('%Y-%m-%d %H:%M')})"
-                )
-            else:
-                del st.session_state.password_overrides[user]
-                if "password_overrides" in admin_settings and user in admin_settings["password_overrides"]:
-                    del admin_settings["password_overrides"][user]
-                    save_admin_settings(admin_settings)
-                st.sidebar.warning(f"Override for {user} expired and was reset")
+@st.fragment
+def render_client_export():
+    check_session_timeout()
+    st.markdown('<div class="client-container">', unsafe_allow_html=True)
+    st.markdown("### 📤 Preview & Export")
+    
+    client_pdf_theme = load_admin_settings().get("client_pdf_theme", "Light")
+    st.info(f"✅ Your portfolio will automatically use **PyStatR+ branding** with **{client_pdf_theme} theme**")
+    
+    if st.button("📄 Generate Portfolio PDF", use_container_width=True):
+        start_export("client_export_job", client_pdf_theme, st.session_state.client_data)
+    render_export_status("client_export_job", "Client_Portfolio")
+    
+    st.markdown('</div>', unsafe_allow_html=True)
 
 def main():
     st.set_page_config(
@@ -1140,8 +1323,9 @@ def main():
     )
     
     apply_custom_css()
+    warm_render_pool()
+    start_metrics_exporters()
     
-    admin_settings = load_admin_settings()
     check_session_timeout()
     
     if 'authenticated' not in st.session_state:
@@ -1195,20 +1379,11 @@ def main():
             """, unsafe_allow_html=True)
 
         st.sidebar.markdown("### ⚙️ Admin Controls")
-        render_password_panel(admin_settings)
-
-        client_pdf_theme = st.sidebar.radio(
-            "🎨 Default PDF Theme for All Clients",
-            ["Light", "Dark"],
-            index=0 if admin_settings["client_pdf_theme"] == "Light" else 1
-        )
-        
-        if client_pdf_theme != admin_settings["client_pdf_theme"]:
-            admin_settings["client_pdf_theme"] = client_pdf_theme
-            save_admin_settings(admin_settings)
-            st.sidebar.success(f"Client theme updated to **{client_pdf_theme}**")
-        
-        presets = load_presets()
+        # sidebar panels rerun independently of the dashboard
+        with st.sidebar:
+            render_password_panel()
+            render_client_theme_setting()
+            render_telemetry_panel()
         
         st.markdown("""
         <div class="main-header">
@@ -1229,289 +1404,18 @@ def main():
         if 'portfolio_data' not in st.session_state:
             st.session_state.portfolio_data = {}
         
+        # each tab is a fragment: typing in one reruns only that tab
         with tab1:
-            st.markdown('<div class="client-container">', unsafe_allow_html=True)
-            st.markdown("## 🎨 Branding Studio")
-            
-            col1, col2 = st.columns([2, 1])
-            
-            with col1:
-                preset_names = list(presets.keys())
-                selected_preset = st.selectbox(
-                    "📚 Brand Preset Library",
-                    ["Create New"] + preset_names
-                )
-            
-            with col2:
-                if selected_preset != "Create New" and selected_preset in presets:
-                    st.success(f"✅ Active: {selected_preset}")
-                    branding = presets[selected_preset]
-                else:
-                    branding = {
-                        "name": "AI Consultant Pro",
-                        "brand_color": "#1E3A8A",
-                        "font_choice": "Helvetica",
-                        "logo": None,
-                        "pdf_theme": "Light"
-                    }
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                name_input = st.text_input(
-                    "👤 Professional Identity",
-                    value=branding.get("name", "")
-                )
-                
-                brand_color = st.color_picker(
-                    "🎨 Signature Brand Color",
-                    value=branding.get("brand_color", "#1E3A8A")
-                )
-            
-            with col2:
-                font_choice = st.selectbox(
-                    "📝 Typography",
-                    ["Helvetica", "Times-Roman", "Courier"],
-                    index=["Helvetica", "Times-Roman", "Courier"].index(
-                        branding.get("font_choice", "Helvetica")
-                    )
-                )
-                
-                pdf_theme = st.radio(
-                    "🌓 Document Theme",
-                    ["Light", "Dark"],
-                    index=0 if branding.get("pdf_theme", "Light") == "Light" else 1,
-                    horizontal=True
-                )
-            
-            st.markdown("### 🖼️ Professional Logo")
-            cover_logo = None
-            logo_upload = st.file_uploader(
-                "📤 Upload Your Brand Mark",
-                type=["png", "jpg", "jpeg"]
-            )
-            
-            if logo_upload:
-                cover_logo = base64.b64encode(logo_upload.read()).decode("utf-8")
-                st.image(base64.b64decode(cover_logo), width=200)
-            elif branding.get("logo"):
-                cover_logo = branding.get("logo")
-                st.image(base64.b64decode(cover_logo), width=200)
-            
-            st.markdown("### 💼 Brand Preset Manager")
-            preset_name_input = st.text_input(
-                "🏷️ Preset Collection Name",
-                value=selected_preset if selected_preset != "Create New" else ""
-            )
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                if st.button("💾 Save Branding Profile", use_container_width=True):
-                    if preset_name_input.strip():
-                        presets[preset_name_input] = {
-                            "name": name_input,
-                            "brand_color": brand_color,
-                            "font_choice": font_choice,
-                            "logo": cover_logo,
-                            "pdf_theme": pdf_theme
-                        }
-                        save_presets(presets)
-                        st.success(f"Brand preset '{preset_name_input}' saved")
-                        st.rerun()
-                    else:
-                        st.error("Please enter a preset name")
-            
-            with col2:
-                if st.button("🗑️ Delete Branding Profile", use_container_width=True):
-                    if selected_preset in presets:
-                        del presets[selected_preset]
-                        save_presets(presets)
-                        st.success(f"Preset '{selected_preset}' removed")
-                        st.rerun()
-            
-            with col3:
-                if st.button("🔄 Reload Preset Library", use_container_width=True):
-                    st.rerun()
-            
-            st.session_state.portfolio_data.update({
-                "name": name_input,
-                "brand_color": brand_color,
-                "font_choice": font_choice,
-                "logo": cover_logo,
-                "pdf_theme": pdf_theme
-            })
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+            render_brand_workshop()
         
         with tab2:
-            st.markdown('<div class="client-container">', unsafe_allow_html=True)
-            st.markdown("## ✍️ Content Builder")
-            
-            st.markdown("### 📋 Project Overview")
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                project_title = st.text_input(
-                    "📌 Portfolio Title",
-                    value="Generative AI Consulting Training Program"
-                )
-            
-            with col2:
-                date = st.date_input("📅 Project Date", datetime.today())
-            
-            sections = [
-                ("📊 Executive Summary", "exec_summary"),
-                ("🚀 Strategic Opportunities", "opportunities"),
-                ("⚠️ Risk Assessment", "risks"),
-                ("🎯 Scenario Analysis", "scenarios"),
-                ("💡 Professional Insights", "reflection"),
-                ("🎨 Design Case Study", "logo_text")
-            ]
-            
-            content_data = {}
-            
-            for title, key in sections:
-                st.markdown(f"### {title}")
-                
-                col1, col2 = st.columns([3, 1])
-                
-                with col1:
-                    if key in ["opportunities", "risks"]:
-                        content_data[key] = st.text_area(
-                            f"{title} Content",
-                            height=120,
-                            label_visibility="collapsed"
-                        )
-                    elif key == "scenarios":
-                        content_data[key] = st.text_area(
-                            f"{title} Content",
-                            value="Strategic Option A | High Investment | 40% Efficiency Gains | Implementation Risk | Highly Recommended\nStrategic Option B | Medium Investment | 25% Cost Savings | Lower Risk Profile | Worth Considering",
-                            height=120,
-                            label_visibility="collapsed"
-                        )
-                    else:
-                        content_data[key] = st.text_area(
-                            f"{title} Content",
-                            height=150,
-                            label_visibility="collapsed"
-                        )
-                
-                with col2:
-                    content_data[f"{key}_images"] = st.file_uploader(
-                        f"🖼️ Images for {title.split(' ', 1)[1]}",
-                        type=["png", "jpg", "jpeg"],
-                        accept_multiple_files=True,
-                        key=f"{key}_images",
-                        label_visibility="collapsed"
-                    )
-                    
-                    if content_data[f"{key}_images"]:
-                        st.success(f"✅ {len(content_data[f'{key}_images'])} image(s)")
-            
-            st.session_state.portfolio_data.update(content_data)
-            st.session_state.portfolio_data.update({
-                "project_title": project_title,
-                "date": date
-            })
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+            render_content_composer()
         
         with tab3:
-            st.markdown('<div class="client-container">', unsafe_allow_html=True)
-            st.markdown("## 👀 Live Preview")
-            
-            data = st.session_state.portfolio_data
-            
-            if data.get("logo"):
-                try:
-                    logo_bytes = base64.b64decode(data["logo"])
-                    st.image(logo_bytes, width=150)
-                except:
-                    pass
-            
-            st.title(data.get("project_title", "Project Title"))
-            st.write(f"**Prepared by:** {data.get('name', 'Your Name')}")
-            
-            if data.get("date"):
-                st.write(f"**Date:** {data['date'].strftime('%B %d, %Y')}")
-            
-            st.markdown("---")
-            
-            sections = [
-                ("Executive Summary", "exec_summary"),
-                ("Strategic Opportunities", "opportunities"),
-                ("Risk Assessment", "risks"),
-                ("Scenario Analysis", "scenarios"),
-                ("Professional Insights", "reflection"),
-                ("Design Case Study", "logo_text")
-            ]
-            
-            for title, key in sections:
-                if data.get(key):
-                    st.subheader(title)
-                    
-                    if key in ["opportunities", "risks"]:
-                        items = [line.strip() for line in data[key].split("\n") if line.strip()]
-                        for item in items:
-                            st.write(f"• {item}")
-                    elif key == "scenarios":
-                        rows = [line.split("|") for line in data[key].split("\n") if "|" in line]
-                        if rows:
-                            headers = ["Option", "Investment", "Benefits", "Risks", "Recommendation"]
-                            table_data = [headers] + [[cell.strip() for cell in row] for row in rows if len(row) >= 5]
-                            st.table(table_data)
-                    else:
-                        st.write(data[key])
-                    
-                    if data.get(f"{key}_images"):
-                        st.image(data[f"{key}_images"], width=300)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+            render_portfolio_preview()
         
         with tab4:
-            st.markdown('<div class="client-container">', unsafe_allow_html=True)
-            st.markdown("## 📑 PDF Export Studio")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                export_theme = st.radio(
-                    "🌓 Export Theme",
-                    ["Light", "Dark"],
-                    horizontal=True
-                )
-            
-            with col2:
-                st.info("**💡 Pro Tips:**\n\n• Use high-res images\n• Keep content concise\n• Preview before export")
-            
-            if st.button("📊 Generate Professional Portfolio", use_container_width=True):
-                try:
-                    with st.spinner("🔄 Creating your portfolio..."):
-                        output_file = "admin_portfolio.pdf"
-                        
-                        pdf_data = st.session_state.portfolio_data.copy()
-                        success = generate_pdf(output_file, theme=export_theme, **pdf_data)
-                        
-                        if success:
-                            with open(output_file, "rb") as f:
-                                pdf_bytes = f.read()
-                            
-                            st.success("✅ Portfolio generated successfully")
-                            st.download_button(
-                                "⬇️ Download Your Portfolio",
-                                pdf_bytes,
-                                file_name=f"Admin_Portfolio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                                mime="application/pdf",
-                                use_container_width=True
-                            )
-                            
-                            os.remove(output_file)
-                        
-                except Exception as e:
-                    st.error(f"Error generating PDF: {str(e)}")
-            
-            st.markdown('</div>', unsafe_allow_html=True)
+            render_export_hub()
     
     elif st.session_state.user_role == "client":
         st.sidebar.markdown("### 👤 Client Portal")
@@ -1542,103 +1446,8 @@ def main():
         
         st.markdown('</div>', unsafe_allow_html=True)
         
-        st.markdown('<div class="client-container">', unsafe_allow_html=True)
-        st.markdown("### 📋 Project Information")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            project_title = st.text_input("📌 Project Title", "Consulting Engagement")
-        with col2:
-            date = st.date_input("📅 Date")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        st.markdown('<div class="client-container">', unsafe_allow_html=True)
-        st.markdown("### 📝 Portfolio Content")
-        
-        exec_summary = st.text_area("📊 Executive Summary", height=150)
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            opportunities = st.text_area("🚀 Strategic Opportunities", height=120)
-        with col2:
-            risks = st.text_area("⚠️ Risk Assessment", height=120)
-        
-        scenarios = st.text_area("🎯 Scenario Analysis", 
-                                value="Primary Strategy | High Investment | 35% ROI | Moderate Risk | Recommended\nAlternative Approach | Medium Investment | 20% ROI | Lower Risk | Consider",
-                                height=100)
-        
-        reflection = st.text_area("💡 Professional Insights", height=150)
-        logo_text = st.text_area("🎨 Design Case Study", height=150)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        st.markdown('<div class="client-container">', unsafe_allow_html=True)
-        st.markdown("### 🖼️ Visual Assets (Optional)")
-        
-        col1, col2 = st.columns(2)
-        with col1:
-            exec_images = st.file_uploader("📊 Executive Summary Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
-            or_images = st.file_uploader("🚀 Opportunities & Risks Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
-            scen_images = st.file_uploader("🎯 Scenario Analysis Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
-        
-        with col2:
-            reflection_images = st.file_uploader("💡 Professional Insights Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
-            logo_images = st.file_uploader("🎨 Design Case Study Images", type=["png", "jpg", "jpeg"], accept_multiple_files=True)
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        st.markdown('<div class="client-container">', unsafe_allow_html=True)
-        st.markdown("### 📤 Preview & Export")
-        
-        client_pdf_theme = admin_settings.get("client_pdf_theme", "Light")
-        st.info(f"✅ Your portfolio will automatically use **PyStatR+ branding** with **{client_pdf_theme} theme**")
-        
-        if st.button("📄 Generate Portfolio PDF", use_container_width=True):
-            try:
-                with st.spinner("🔄 Creating your professional portfolio..."):
-                    output_file = "client_portfolio.pdf"
-                    
-                    client_data = {
-                        "project_title": project_title,
-                        "date": date,
-                        "name": f"Client Portfolio - {st.session_state.user_name}",
-                        "brand_color": "#1E3A8A",
-                        "font_choice": "Helvetica",
-                        "exec_summary": exec_summary,
-                        "opportunities": opportunities,
-                        "risks": risks,
-                        "scenarios": scenarios,
-                        "reflection": reflection,
-                        "logo_text": logo_text,
-                        "exec_summary_images": exec_images,
-                        "opportunities_images": or_images,
-                        "risks_images": or_images,
-                        "scenarios_images": scen_images,
-                        "reflection_images": reflection_images,
-                        "logo_text_images": logo_images
-                    }
-                    
-                    success = generate_pdf(output_file, theme=client_pdf_theme, **client_data)
-                    
-                    if success:
-                        with open(output_file, "rb") as f:
-                            pdf_bytes = f.read()
-                        
-                        st.success("✅ Portfolio generated successfully")
-                        st.download_button(
-                            "⬇️ Download Your Portfolio",
-                            pdf_bytes,
-                            file_name=f"Client_Portfolio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
-                        os.remove(output_file)
-                    
-            except Exception as e:
-                st.error(f"Error generating PDF: {str(e)}")
-        
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_client_composer()
+        render_client_export()
     
     st.markdown("---")
     st.markdown("""
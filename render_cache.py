@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+
+# Shared by every Streamlit worker process on the host
+RENDER_CACHE_DIR = ".render_cache"
+MEMORY_MAX_ITEMS = 32
+MEMORY_MAX_BYTES = 64 << 20
+DISK_MAX_BYTES = 512 << 20
+
+# Bump when the PDF layout changes so stale renders are not served
+CACHE_VERSION = 4
+
+# ---------- KEYS ----------
+
+def _content_hash(item):
+    if isinstance(item, (bytes, bytearray)):
+        data = bytes(item)
+    elif hasattr(item, "getvalue"):
+        data = item.getvalue()
+    else:
+        item.seek(0)
+        data = item.read()
+    return hashlib.sha256(data).hexdigest()
+
+def _canonical(key, value):
+    if key.endswith("_images"):
+        return [_content_hash(item) for item in value or []]
+    if key.endswith("_file"):
+        return _content_hash(value) if value else None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+def portfolio_key(theme, spec):
+    """Stable hash of everything a render depends on (images by content)."""
+    canonical = {k: _canonical(k, v) for k, v in spec.items()}
+    payload = json.dumps(
+        {"version": CACHE_VERSION, "theme": theme, "spec": canonical},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def pdf_etag(data):
+    # PDFs are built in ReportLab's invariant mode, so equal inputs give equal tags
+    return '"' + hashlib.sha256(data).hexdigest()[:32] + '"'
+
+# ---------- CACHE ----------
+
+class RenderCache:
+    """Rendered PDFs by ``portfolio_key``: a small in-process LRU in front of
+    a directory capped by total bytes (oldest-used files evicted first)."""
+
+    def __init__(self, directory=RENDER_CACHE_DIR, memory_items=MEMORY_MAX_ITEMS,
+                 memory_bytes=MEMORY_MAX_BYTES, disk_bytes=DISK_MAX_BYTES):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".pdf")
+
+    # --- memory tier
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= len(old)
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory and (len(self._memory) > self.memory_items
+                                    or self._memory_size > self.memory_bytes):
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+
+    # --- public
+
+    def get(self, key):
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                return data
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            return None
+        self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        self._remember(key, data)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return
+        self._evict()
+
+    def get_or_render(self, key, render):
+        data = self.get(key)
+        if data is None:
+            data = render()
+            if data:
+                self.put(key, data)
+        return data
+
+    def _evict(self):
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".pdf"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # evicted by another process
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self.disk_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+            if total <= self.disk_bytes:
+                break
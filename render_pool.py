@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Renderer worker processes (off unless configured): ReportLab holds the GIL,
+# so concurrent exports only use more than one core from separate processes.
+#   PORTFOLIO_RENDER_WORKERS    number of processes, 0 = render in-thread
+#   PORTFOLIO_RENDER_MAX_TASKS  renders before a worker is replaced, 0 = never
+WORKERS_ENV = "PORTFOLIO_RENDER_WORKERS"
+MAX_TASKS_ENV = "PORTFOLIO_RENDER_MAX_TASKS"
+DEFAULT_MAX_TASKS = 200
+
+WARM_THEMES = ("Light", "Dark")
+WARM_FONTS = ("Helvetica", "Times-Roman", "Courier")
+
+def _env_int(name, default):
+    try:
+        return max(int(os.environ.get(name, default)), 0)
+    except ValueError:
+        return default
+
+# ---------- WORKER SIDE ----------
+
+def _warm_worker(themes, fonts):
+    """Process initializer: pay import, style and font-metric costs once."""
+    from reportlab.pdfbase import pdfmetrics
+    import portfolio_pdf
+
+    for face in {*fonts, "Helvetica-Bold", "Helvetica-Oblique"}:
+        pdfmetrics.getFont(face)
+    for theme in themes:
+        portfolio_pdf._scenario_cell_styles(theme)
+        portfolio_pdf._scenario_table_style(theme)
+        for font in fonts:
+            portfolio_pdf._make_styles(theme, base_font=font)
+
+def _render_job(theme, spec):
+    from portfolio_pdf import render_portfolio
+    return render_portfolio(theme=theme, **spec)
+
+# ---------- POOL ----------
+
+class RenderPool:
+    """Warm renderer processes; ``submit`` returns a future of a RenderResult.
+
+    Specs must be picklable (bytes for images, see export_jobs.portfolio_spec).
+    Workers are started with ``spawn`` so no Streamlit threads or sockets are
+    inherited, and are recycled after ``max_tasks`` renders to cap memory.
+    """
+
+    def __init__(self, workers=None, max_tasks=None, themes=WARM_THEMES, fonts=WARM_FONTS):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_tasks = max_tasks
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+            initargs=(themes, fonts),
+            max_tasks_per_child=max_tasks or None,
+        )
+
+    def submit(self, theme, spec):
+        return self._executor.submit(_render_job, theme, spec)
+
+    def render(self, theme, spec):
+        return self.submit(theme, spec).result()
+
+    def warm_up(self):
+        """Start the workers now instead of on the first exports."""
+        futures = [self._executor.submit(os.getpid) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_render_pool():
+    """Process-wide pool sized from the environment, or None when disabled."""
+    global _pool
+    workers = _env_int(WORKERS_ENV, 0)
+    if not workers:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = RenderPool(workers, _env_int(MAX_TASKS_ENV, DEFAULT_MAX_TASKS))
+        return _pool
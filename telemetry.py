@@ -0,0 +1,241 @@
+import bisect
+import contextvars
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Export phase timings and counters, aggregated in process and exposed in
+# Prometheus text format. Off unless PORTFOLIO_TELEMETRY is set; disabled
+# spans are a shared no-op context manager.
+#   PORTFOLIO_TELEMETRY      1/true/yes to record
+#   PORTFOLIO_METRICS_PORT   serve /metrics on 127.0.0.1:<port>
+#   PORTFOLIO_METRICS_HOST   listen address for the above (default 127.0.0.1)
+#   PORTFOLIO_METRICS_FILE   rewrite this file after each export (node exporter textfile collector)
+ENABLED = os.environ.get("PORTFOLIO_TELEMETRY", "").lower() in ("1", "true", "yes", "on")
+METRICS_PORT = os.environ.get("PORTFOLIO_METRICS_PORT")
+METRICS_HOST = os.environ.get("PORTFOLIO_METRICS_HOST", "127.0.0.1")
+METRICS_FILE = os.environ.get("PORTFOLIO_METRICS_FILE")
+
+PREFIX = "portfolio_"
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "phase_seconds": ("histogram", "Time spent in each export phase."),
+    "exports_total": ("counter", "Portfolio exports by outcome."),
+    "cache_hits_total": ("counter", "Exports served from the render cache."),
+    "pages_total": ("counter", "Pages rendered."),
+    "pdf_bytes_total": ("counter", "PDF bytes produced."),
+    "images_total": ("counter", "Section images placed (distinct per export)."),
+}
+
+# ---------- REGISTRY ----------
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.buckets[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding quantile ``q`` (Prometheus-style estimate)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS + (float("inf"),), self.buckets):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = _Histogram()
+            hist.observe(value)
+
+    def phase_summary(self):
+        """[(phase, count, mean, p50, p95)] for the admin sidebar."""
+        rows = []
+        with self._lock:
+            for (name, labels), hist in sorted(self._histograms.items()):
+                if name == "phase_seconds" and hist.count:
+                    rows.append((dict(labels)["phase"], hist.count, hist.sum / hist.count,
+                                 hist.quantile(0.5), hist.quantile(0.95)))
+        return rows
+
+    def counter(self, name, **labels):
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def prometheus(self):
+        lines = []
+        with self._lock:
+            for name, (kind, help_text) in METRIC_HELP.items():
+                full = PREFIX + name
+                lines.append(f"# HELP {full} {help_text}")
+                lines.append(f"# TYPE {full} {kind}")
+                if kind == "counter":
+                    for (n, labels), value in sorted(self._counters.items()):
+                        if n == name:
+                            lines.append(f"{full}{_labels(labels)} {value}")
+                    continue
+                for (n, labels), hist in sorted(self._histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(BUCKETS + (float("inf"),), hist.buckets):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{full}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{full}_sum{_labels(labels)} {hist.sum}")
+                    lines.append(f"{full}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+REGISTRY = Registry()
+
+# ---------- RECORDING ----------
+
+# Inside render_portfolio spans are collected per render (and shipped back
+# from worker processes with the result); elsewhere they go to REGISTRY.
+_collection = contextvars.ContextVar("telemetry_collection", default=None)
+_NOOP = nullcontext()
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        collected = _collection.get()
+        if collected is not None:
+            collected["spans"].append((self.name, elapsed))
+        else:
+            REGISTRY.observe("phase_seconds", elapsed, phase=self.name)
+        return False
+
+def span(name):
+    """Time a block as export phase ``name`` (no-op unless enabled)."""
+    if not ENABLED:
+        return _NOOP
+    return _Span(name)
+
+def count(name, value=1):
+    """Add to a per-render counter (e.g. images) inside ``collect``."""
+    if ENABLED:
+        collected = _collection.get()
+        if collected is not None:
+            collected["counts"][name] = collected["counts"].get(name, 0) + value
+
+@contextmanager
+def collect():
+    """Gather this render's spans/counts into a plain, picklable dict."""
+    collected = {"spans": [], "counts": {}} if ENABLED else None
+    token = _collection.set(collected)
+    try:
+        yield collected
+    finally:
+        _collection.reset(token)
+
+def record_render(result, cache_hit=False):
+    """Fold one finished RenderResult into the process metrics."""
+    if not ENABLED:
+        return
+    if cache_hit:
+        REGISTRY.inc("cache_hits_total")
+    REGISTRY.inc("exports_total", status="ok" if result.ok else "failed")
+    if result.ok and not cache_hit:
+        REGISTRY.inc("pages_total", result.pages)
+        REGISTRY.inc("pdf_bytes_total", len(result.pdf))
+    collected = result.telemetry or {}
+    for phase, seconds in collected.get("spans", ()):
+        REGISTRY.observe("phase_seconds", seconds, phase=phase)
+    REGISTRY.inc("images_total", collected.get("counts", {}).get("images", 0))
+    if result.elapsed:
+        REGISTRY.observe("phase_seconds", result.elapsed, phase="total")
+    if METRICS_FILE:
+        write_textfile(METRICS_FILE)
+
+# ---------- EXPOSITION ----------
+
+def write_textfile(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".prom")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(REGISTRY.prometheus())
+        os.replace(tmp, path)
+    except OSError:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes are not worth a log line each
+
+def start_http_server(port, host=METRICS_HOST):
+    server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    return server
+
+def start_exporters():
+    """Start the configured exporters once per process; returns the HTTP server, if any."""
+    if not ENABLED:
+        return None
+    if METRICS_FILE:
+        write_textfile(METRICS_FILE)
+    if METRICS_PORT:
+        try:
+            return start_http_server(METRICS_PORT)
+        except OSError:
+            return None  # port taken, e.g. by another app process on the host
+    return None